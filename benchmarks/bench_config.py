@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+"""Measure the calls of :py:class:`stoiridh.qbs.tools.Config`.
+
+A configuration file of *sections* sections is generated in a temporary directory, then it is
+opened, and its sections are read and updated *count* times. Each call is measured as it was done
+before, i.e., through the executor of the loop, and as it is done now, i.e., in memory.
+
+Finally, the configuration file is opened by *opens* new :py:class:`stoiridh.qbs.tools.Config`
+objects, which share the file parsed once, then by as many objects after each change of the file.
+
+Usage::
+
+    python -m benchmarks.bench_config [--count N] [--sections N] [--opens N]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from pathlib import Path
+from stoiridh.qbs.tools import Config
+
+
+def report(name, elapsed, count):
+    print('%-24s %.3fs %10.0f calls/s' % (name, elapsed, count / elapsed))
+
+
+async def bench(config, count, sections):
+    loop = asyncio.get_event_loop()
+
+    start = time.perf_counter()
+    cfg = await config.open()
+    print('%-24s %.3fs' % ('open', time.perf_counter() - start))
+
+    start = time.perf_counter()
+    for i in range(count):
+        await loop.run_in_executor(None, cfg._read, 's%d' % (i % sections))
+    report('read (executor)', time.perf_counter() - start, count)
+
+    start = time.perf_counter()
+    for i in range(count):
+        await cfg.read('s%d' % (i % sections))
+    report('read', time.perf_counter() - start, count)
+
+    start = time.perf_counter()
+    for i in range(count):
+        await loop.run_in_executor(None, cfg._update, 's%d' % (i % sections), {'i': str(i)}, False)
+    report('update (executor)', time.perf_counter() - start, count)
+
+    start = time.perf_counter()
+    for i in range(count):
+        await cfg.update('s%d' % (i % sections), {'i': str(i)})
+    report('update', time.perf_counter() - start, count)
+
+
+async def bench_open(path, loop, opens):
+    filepath = Path(path, Config.FILENAME)
+
+    start = time.perf_counter()
+    for _ in range(opens):
+        async with Config(path, loop).open():
+            pass
+    report('open (cached)', time.perf_counter() - start, opens)
+
+    start = time.perf_counter()
+    for _ in range(opens):
+        # the file changes on the disk, so it is parsed again.
+        os.utime(str(filepath))
+        async with Config(path, loop).open():
+            pass
+    report('open (changed)', time.perf_counter() - start, opens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=10000, help="number of calls")
+    parser.add_argument('--sections', type=int, default=100, help="number of sections")
+    parser.add_argument('--opens', type=int, default=1000, help="number of Config objects")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='StoiridhQbsTools') as d:
+        with Path(d, Config.FILENAME).open(mode='w', encoding='utf-8') as f:
+            for i in range(args.sections):
+                f.write('[s%d]\nfilepath = /usr/bin/qbs\nversion = 1.5.%d\n\n' % (i, i))
+
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(bench(Config(d, loop), args.count, args.sections))
+        loop.run_until_complete(bench_open(d, loop, args.opens))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+"""Measure the copy of an extracted package into its install location.
+
+A package of *count* files of *size* kilobytes is generated in a temporary directory, then copied
+with :py:func:`shutil.copytree`, and with :py:class:`stoiridh.qbs.tools.sdk._CopyEngine` through an
+increasing number of threads. The destination may be given with *--dest*, e.g., a directory on a
+networked filesystem, where the latency of each file dominates.
+
+Usage::
+
+    python -m benchmarks.bench_copy [--count N] [--size KB] [--dest DIR]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from pathlib import Path
+from stoiridh.qbs.tools.sdk import _CopyEngine
+
+
+def report(name, elapsed, count, size):
+    print('%-24s %.3fs %8.0f files/s %8.1f MB/s' % (name, elapsed, count / elapsed,
+                                                    size / elapsed / 1e6))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=2000, help="number of files")
+    parser.add_argument('--size', type=int, default=16, help="size of the files, in KB")
+    parser.add_argument('--dest', default=None, help="directory where the files are copied")
+    args = parser.parse_args()
+    size = args.count * args.size * 1024
+
+    with tempfile.TemporaryDirectory(prefix='StoiridhQbsTools') as s, \
+            tempfile.TemporaryDirectory(prefix='StoiridhQbsTools', dir=args.dest) as d:
+        src = Path(s)
+        for i in range(args.count):
+            filepath = src.joinpath('modules', 'm%d' % (i // 100), 'f%d.qbs' % i)
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            filepath.write_bytes(os.urandom(args.size * 1024))
+
+        dst = Path(d, 'copytree')
+        start = time.perf_counter()
+        shutil.copytree(str(src), str(dst))
+        report('copytree', time.perf_counter() - start, args.count, size)
+
+        workers = 1
+        while workers <= 16:
+            dst = Path(d, 'engine-%d' % workers)
+            start = time.perf_counter()
+            _CopyEngine(workers).copy(src, dst)
+            report('_CopyEngine (%d)' % workers, time.perf_counter() - start, args.count, size)
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
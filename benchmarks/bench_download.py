@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+"""Measure the streaming download of a large package from a local HTTP server.
+
+A package of *size* megabytes is served by a :py:mod:`http.server` running in a background thread,
+then it is downloaded by :py:meth:`stoiridh.qbs.tools.sdk._Package._download`. The throughput and
+the peak of memory allocated by Python during the download are reported, the latter must stay in
+the order of magnitude of :py:attr:`~stoiridh.qbs.tools.sdk._Package.CHUNK_SIZE`.
+
+Usage::
+
+    python -m benchmarks.bench_download [--size MB]
+"""
+import argparse
+import asyncio
+import http.server
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from pathlib import Path
+from stoiridh.qbs.tools.sdk import _Package
+
+
+class RequestHandler(http.server.SimpleHTTPRequestHandler):
+    def translate_path(self, path):
+        return os.path.join(self.server.root, os.path.basename(path))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=256, help="size of the package, in MB")
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+
+    with tempfile.TemporaryDirectory(prefix='StoiridhQbsTools') as d:
+        served = Path(d, 'served')
+        served.mkdir()
+        with served.joinpath('9.9.9.tar.gz').open(mode='wb') as f:
+            chunk = os.urandom(1024 * 1024)
+            for _ in range(args.size):
+                f.write(chunk)
+
+        server = http.server.HTTPServer(('127.0.0.1', 0), RequestHandler)
+        server.root = str(served)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        url = 'http://127.0.0.1:%d/9.9.9.tar.gz' % server.server_address[1]
+        package = _Package('9.9.9', url, Path(d, 'qbs'), loop)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        package._download(d)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        server.shutdown()
+        server.server_close()
+
+        assert package.temp.filepath.stat().st_size == args.size * 1024 * 1024
+
+    print('%d MB downloaded in %.3fs (%.1f MB/s)' % (args.size, elapsed, args.size / elapsed))
+    print('peak of memory allocated: %.1f KB' % (peak / 1024))
+
+    loop.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+"""Measure the extraction of the ``<root>/share`` directory of a large package.
+
+A synthetic archive of *count* small members, most of them within ``<root>/share``, is extracted
+twice: as the packages used to be, by listing the members with :py:meth:`tarfile.TarFile.getnames`
+then extracting each of them by name, and with :py:class:`stoiridh.qbs.tools.sdk._Extractor`, which
+reads the archive once. The latter is also measured over the archive opened in stream mode.
+
+Usage::
+
+    python -m benchmarks.bench_extract [--count N]
+"""
+import argparse
+import io
+import tarfile
+import tempfile
+import time
+
+from pathlib import Path
+from stoiridh.qbs.tools.sdk import _Extractor
+
+
+def generate(filepath, count):
+    with tarfile.open(str(filepath), mode='w:gz') as tar:
+        for i in range(count):
+            share = 'share/' if i % 10 else ''
+            name = 'root/%sqbs/modules/m%d/f%d.qbs' % (share, i // 100, i)
+            data = ('// %s\n' % name).encode() * 4
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+def bench_legacy(filepath, path):
+    with tarfile.open(str(filepath), mode='r:gz') as tar:
+        rootdir = '%s/share' % tar.getnames()[0].split('/')[0]
+        for info in tar:
+            if info.isfile() and info.name.startswith(rootdir):
+                tar.extract(info.name, path=str(path))
+
+
+def bench_extractor(filepath, path, mode='r:gz'):
+    with tarfile.open(str(filepath), mode=mode) as tar:
+        _Extractor(tar, path).extract()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=20000, help="number of members")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='StoiridhQbsTools') as d:
+        filepath = Path(d, 'package.tar.gz')
+        generate(filepath, args.count)
+
+        benchmarks = [('getnames + extract by name', bench_legacy, ()),
+                      ('_Extractor', bench_extractor, ()),
+                      ('_Extractor (stream)', bench_extractor, ('r|gz',))]
+
+        for i, (name, func, extra) in enumerate(benchmarks):
+            path = Path(d, str(i))
+            path.mkdir()
+            start = time.perf_counter()
+            func(filepath, path, *extra)
+            print('%-28s %.3fs' % (name, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
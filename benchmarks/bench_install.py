@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+"""Measure the overlap of the stages of :py:meth:`stoiridh.qbs.tools.SDK.install`.
+
+*count* packages are served by a :py:mod:`http.server` running in a background thread, each
+response being delayed by a random time of at most *delay* seconds, then they are installed into a
+temporary directory. The wall time is reported along with the sum of the slowest download, the
+slowest extraction and the slowest installation, the former should stay below the latter since the
+packages go through the stages independently of each other. The limits of concurrent downloads are
+raised to *count*, so that they are not measured. With :py:attr:`~stoiridh.qbs.tools.SDK.STREAMING`,
+the packages are extracted while they are downloaded, so the extraction is part of the download.
+
+Usage::
+
+    python -m benchmarks.bench_install [--count N] [--delay SECONDS]
+"""
+import argparse
+import asyncio
+import http.server
+import os
+import random
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+
+from pathlib import Path
+from stoiridh.qbs.tools import SDK
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    # http.server.ThreadingHTTPServer is only available from Python 3.7.
+    daemon_threads = True
+
+
+class RequestHandler(http.server.SimpleHTTPRequestHandler):
+    def translate_path(self, path):
+        return os.path.join(self.server.root, os.path.basename(path))
+
+    def do_GET(self):
+        time.sleep(random.uniform(0, self.server.delay))
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=8, help="number of packages")
+    parser.add_argument('--delay', type=float, default=1.0,
+                        help="maximum delay of the responses, in seconds")
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    versions = ['9.%d.0' % i for i in range(args.count)]
+
+    with tempfile.TemporaryDirectory(prefix='StoiridhQbsTools') as d:
+        served = Path(d, 'served')
+        served.mkdir()
+        for version in versions:
+            shutil.copy('tests/data/1.1.0.tar.gz', str(served.joinpath('%s.tar.gz' % version)))
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), RequestHandler)
+        server.root = str(served)
+        server.delay = args.delay
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        # install the packages into the temporary directory.
+        os.environ['HOME'] = os.environ['APPDATA'] = d
+        SDK.URL = 'http://127.0.0.1:%d/{version}.tar.gz' % server.server_address[1]
+        SDK.MAX_DOWNLOADS = SDK.MAX_DOWNLOADS_PER_HOST = args.count
+        sdk = SDK(versions)
+
+        start = time.perf_counter()
+        loop.run_until_complete(sdk.install())
+        elapsed = time.perf_counter() - start
+
+        server.shutdown()
+        server.server_close()
+
+        assert not list(sdk.noninstalled_packages)
+
+    timings = sdk.timings.values()
+    stages = ('download', 'extract', 'install')
+    slowest = {s: max(t.get(s, 0.0) for t in timings) for s in stages}
+
+    for stage, t in slowest.items():
+        print('slowest %s: %.3fs' % (stage, t))
+    print('%d packages installed in %.3fs (sum of the slowest stages: %.3fs)'
+          % (args.count, elapsed, sum(slowest.values())))
+
+    loop.close()
+
+
+if __name__ == '__main__':
+    main()
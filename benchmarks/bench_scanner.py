@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+"""Compare the sequential and the concurrent scans of :py:class:`stoiridh.qbs.tools.qbs.Scanner`.
+
+A fake ``PATH`` environment variable made of 50 directories is generated, each directory holding a
+fake Qbs executable. Only the last one satisfies the minimum version of the scanner, so that every
+candidate must be spawned.
+
+Usage::
+
+    python -m benchmarks.bench_scanner [--directories N] [--delay SECONDS] [--concurrency N]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import stat
+import tempfile
+import time
+
+from pathlib import Path
+from stoiridh.qbs.tools import VersionNumber
+from stoiridh.qbs.tools.qbs import Scanner
+
+
+def make_fake_path(root, directories, delay):
+    # the fake PATH environment variable hides the sleep command
+    sleep = shutil.which('sleep')
+    paths = []
+
+    for i in range(directories):
+        path = Path(root, 'bin%02d' % i)
+        path.mkdir()
+        version = '1.6.0' if i == directories - 1 else '1.4.%d' % i
+        filepath = path.joinpath('qbs')
+        with filepath.open(mode='w') as f:
+            f.write('#!/bin/sh\n%s %s >/dev/null\necho %s\n' % (sleep, delay, version))
+        filepath.chmod(filepath.stat().st_mode | stat.S_IXUSR)
+        paths.append(str(path))
+
+    return os.pathsep.join(paths)
+
+
+def measure(loop, scanner, **kwargs):
+    start = time.perf_counter()
+    qbs = loop.run_until_complete(scanner.scan(loop=loop, **kwargs))
+    return time.perf_counter() - start, qbs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--directories', type=int, default=50)
+    parser.add_argument('--delay', type=float, default=0.02,
+                        help="time spent by each fake Qbs executable before to answer")
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    scanner = Scanner(minimum_version=VersionNumber('1.5.0'))
+
+    with tempfile.TemporaryDirectory(prefix='StoiridhQbsTools') as d:
+        os.environ.pop('QBS_HOME', None)
+        os.environ['PATH'] = make_fake_path(d, args.directories, args.delay)
+
+        sequential, a = measure(loop, scanner)
+        concurrent, b = measure(loop, scanner, concurrency=args.concurrency)
+
+    assert a == b, 'the concurrent scan should find the same Qbs executable (%r != %r)' % (a, b)
+
+    print('%d directories, %.3fs per executable' % (args.directories, args.delay))
+    print('sequential scan:                %8.3fs' % sequential)
+    print('concurrent scan (limit=%3d):    %8.3fs  (x%.1f)'
+          % (args.concurrency, concurrent, sequential / concurrent))
+
+    loop.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+"""Measure the verification of an installed package against its manifest.
+
+A package of *count* files of *size* kilobytes is generated in a temporary directory, then its
+:py:class:`stoiridh.qbs.tools.Manifest` is built. The verification is measured without hashing,
+i.e., by checking the sizes and the modification times of the files only, then by hashing the files
+with an increasing number of threads.
+
+Usage::
+
+    python -m benchmarks.bench_verify [--count N] [--size KB]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from pathlib import Path
+from stoiridh.qbs.tools import Manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=2000, help="number of files")
+    parser.add_argument('--size', type=int, default=64, help="size of the files, in KB")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='StoiridhQbsTools') as d:
+        for i in range(args.count):
+            filepath = Path(d, 'modules', 'm%d' % (i // 100), 'f%d.qbs' % i)
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            filepath.write_bytes(os.urandom(args.size * 1024))
+
+        start = time.perf_counter()
+        manifest = Manifest.build(d)
+        print('%-24s %.3fs' % ('build', time.perf_counter() - start))
+
+        start = time.perf_counter()
+        assert not manifest.verify(d)
+        print('%-24s %.3fs' % ('verify (sizes, mtimes)', time.perf_counter() - start))
+
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            start = time.perf_counter()
+            assert not manifest.verify(d, hash=True, workers=workers)
+            print('%-24s %.3fs' % ('verify (hash, %d)' % workers, time.perf_counter() - start))
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+"""Microbenchmarks of :py:class:`stoiridh.qbs.tools.VersionNumber`.
+
+Each benchmark runs over a list of random version numbers: parsing, comparing two by two, sorting,
+and hashing (building a :py:obj:`set` and looking up a :py:obj:`dict`). The parsing is measured
+twice: over mostly distinct strings, and over a handful of strings repeated many times, which is the
+common case within the tools and which is served by the cache of :py:class:`VersionNumber`.
+
+Finally, the parsing and the sorting of a release listing, i.e., tag names of which some are not
+valid version numbers, is measured with the constructor and with :py:meth:`VersionNumber.parse_all`.
+
+Usage::
+
+    python -m benchmarks.bench_versionnumber [--count N] [--seed N]
+"""
+import argparse
+import random
+import time
+
+from stoiridh.qbs.tools import VersionNumber
+
+
+def generate(count, seed, majors=10, minors=20, patches=50):
+    rand = random.Random(seed)
+    return ['%d.%d.%d' % (rand.randrange(majors), rand.randrange(minors), rand.randrange(patches))
+            for _ in range(count)]
+
+
+def bench_parse(strings):
+    return [VersionNumber(s) for s in strings]
+
+
+def bench_compare(versions):
+    count = 0
+    for a, b in zip(versions, versions[1:]):
+        if a < b:
+            count += 1
+        if a == b:
+            count += 1
+    return count
+
+
+def bench_sort(versions):
+    return sorted(versions)
+
+
+def bench_hash(versions):
+    unique = set(versions)
+    index = dict.fromkeys(unique, True)
+    return sum(1 for v in versions if v in index)
+
+
+def generate_tags(count, seed):
+    rand = random.Random(seed)
+    tags = []
+    for _ in range(count):
+        tag = '%d.%d.%d' % (rand.randrange(30), rand.randrange(100), rand.randrange(100))
+        if rand.random() < 0.05:
+            tag += '-rc%d' % rand.randrange(1, 4)
+        tags.append(tag)
+    return tags
+
+
+def bench_tags_constructor(tags):
+    versions = []
+    for tag in tags:
+        try:
+            versions.append(VersionNumber(tag))
+        except ValueError:
+            pass
+    return sorted(versions)
+
+
+def bench_tags_parse_all(tags):
+    return VersionNumber.parse_all(tags)
+
+
+def run(name, count, function, *args):
+    start = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - start
+    print('%-18s %10.3fs  %12.0f ops/s' % (name, elapsed, count / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    strings = generate(args.count, args.seed)
+    repeated = generate(args.count, args.seed, majors=1, minors=4, patches=5)
+    versions = bench_parse(strings)
+
+    print('%d version numbers' % args.count)
+    VersionNumber.cache_clear()
+    run('parse', args.count, bench_parse, strings)
+    VersionNumber.cache_clear()
+    run('parse (repeated)', args.count, bench_parse, repeated)
+    print('  %s' % (VersionNumber.cache_info(),))
+    run('compare', args.count, bench_compare, versions)
+    run('sort', args.count, bench_sort, versions)
+    run('hash', args.count, bench_hash, versions)
+
+    tags = generate_tags(args.count, args.seed)
+    print('%d release tags' % args.count)
+    VersionNumber.cache_clear()
+    run('constructor', args.count, bench_tags_constructor, tags)
+    run('parse_all', args.count, bench_tags_parse_all, tags)
+    assert bench_tags_constructor(tags) == bench_tags_parse_all(tags)[0]
+
+
+if __name__ == '__main__':
+    main()
@@ -43,6 +43,20 @@ def prepare_arguments(parser):
                                description="""Install the non-installed versions of %s"""
                                            % STOIRIDH_PROJECT_NAME)
     init.add_argument('-f', '--force', action='store_true', help="force initialisation")
+    init.add_argument('-s', '--source', action='append', dest='sources', metavar='SOURCE',
+                      help="download the packages from SOURCE, either a local directory or a URL "
+                           "template containing {version}; may be given several times, in "
+                           "priority order")
+
+    # verify command
+    verify = commands.add_parser('verify',
+                                 help="verify the installed versions of %s" % STOIRIDH_PROJECT_NAME,
+                                 description="""Check the files of the installed versions of %s
+                                             against their manifest"""
+                                             % STOIRIDH_PROJECT_NAME)
+    verify.add_argument('--hash', action='store_true',
+                        help="hash the files, rather than checking their size and their "
+                             "modification time only")
 
 
 def main():
@@ -58,7 +72,7 @@ def main():
 
     if args.command == 'init':
         loop = asyncio.get_event_loop()
-        sdk = SDK(STOIRIDH_SUPPORTED_VERSIONS)
+        sdk = SDK(STOIRIDH_SUPPORTED_VERSIONS, sources=args.sources)
         if args.force:
             sdk.clean()
         print('There are %d supported version(s) of %s...' % (len(STOIRIDH_SUPPORTED_VERSIONS),
@@ -66,6 +80,16 @@ def main():
         # start the install of the SDK in an asynchronous way
         loop.run_until_complete(sdk.install())
         loop.close()
+    elif args.command == 'verify':
+        loop = asyncio.get_event_loop()
+        sdk = SDK(STOIRIDH_SUPPORTED_VERSIONS)
+        results = loop.run_until_complete(sdk.verify(hash=args.hash))
+        loop.close()
+        for version, failures in sorted(results.items()):
+            print('%s: %s' % (version, 'OK' if not failures else '%d error(s)' % len(failures)))
+            for name, reason in failures:
+                print('    %s (%s)' % (name, reason))
+        exit(1 if any(results.values()) else 0)
     else:
         parser.print_help()
 
@@ -1,6 +1,13 @@
 # -*- coding: utf-8 -*-
+from .archivecache import ArchiveCache
 from .config import Config
+from .filelock import FileLock
+from .manifest import Manifest
+from .objectstore import ObjectStore
 from .sdk import SDK
+from .sources import DirectorySource, URLSource
+from .versionconstraint import VersionConstraint
 from .versionnumber import VersionNumber
 
-__all__ = ['Config', 'SDK', 'VersionNumber']
+__all__ = ['ArchiveCache', 'Config', 'DirectorySource', 'FileLock', 'Manifest', 'ObjectStore',
+           'SDK', 'URLSource', 'VersionConstraint', 'VersionNumber']
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+import configparser
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from pathlib import Path
+from .manifest import Manifest
+
+
+# logging
+LOG = logging.getLogger(__name__)
+
+
+class ArchiveCache:
+    FILENAME = 'index'
+    # default size limit of the cache, in bytes.
+    MAX_SIZE = 512 * 1024 * 1024
+
+    def __init__(self, path, max_size=None):
+        """Construct an :py:class:`ArchiveCache` object.
+
+        The cache stores the archives of the packages downloaded by the
+        :py:class:`~stoiridh.qbs.tools.SDK`, each one under the name of its SHA-256 digest, so that
+        an archive served from several URLs is only stored once. The index of the cache maps each
+        URL to the digest of its archive, along with the last time it was used.
+
+        Parameters:
+
+        - *path*, corresponds to the directory where the archives and the index are stored.
+          Generally speaking, this is the ``archives`` subdirectory of the
+          :py:attr:`~stoiridh.qbs.tools.SDK.install_root_path` directory.
+
+        - *max_size*, is an optional parameter that limits the total size of the archives, in
+          bytes. If :py:obj:`None`, then the limit is :py:attr:`MAX_SIZE`. The least recently used
+          archives are evicted, when the cache is saved, until the limit is satisfied.
+
+        :raise: :py:exc:`TypeError` when *path* is not a :py:class:`str` object or a
+                :py:class:`pathlib.Path` object.
+        """
+        if isinstance(path, str):
+            self._path = Path(path)
+        elif isinstance(path, Path):
+            self._path = path
+        else:
+            raise TypeError("argument (path) should be a str or pathlib.Path object, not %r"
+                            % type(path))
+
+        self._max_size = self.MAX_SIZE if max_size is None else max_size
+        self._entries = None
+        self._modified = False
+        # the archives are looked up and stored from the threads downloading the packages.
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        """This read-only property returns the path where the archives are located.
+
+        :rtype: pathlib.Path
+        """
+        return self._path
+
+    @property
+    def filepath(self):
+        """This read-only property returns the filepath of the index.
+
+        :rtype: pathlib.Path
+        """
+        return self._path.joinpath(self.FILENAME)
+
+    @property
+    def max_size(self):
+        """This read-only property returns the size limit of the cache, in bytes.
+
+        :rtype: int
+        """
+        return self._max_size
+
+    @property
+    def size(self):
+        """This read-only property returns the total size of the archives, in bytes.
+
+        :rtype: int
+        """
+        with self._lock:
+            return sum(size for _, size in self._archives().values())
+
+    def lookup(self, url):
+        """Return the filepath of the archive downloaded from *url* if the cache holds it;
+        otherwise, return :py:obj:`None`.
+
+        The archive is checked against its SHA-256 digest, so that an archive altered on the disk
+        is removed from the cache, and downloaded again, rather than extracted.
+
+        :rtype: pathlib.Path or :py:obj:`None`
+        """
+        with self._lock:
+            entry = self._load().get(url)
+
+            if entry is None:
+                return None
+
+            filepath = self._archive_path(entry[0])
+
+            try:
+                valid = (filepath.stat().st_size == entry[1]
+                         and Manifest.hash(Path(filepath)) == entry[0])
+            except OSError:
+                valid = False
+
+            if not valid:
+                # the archive was removed or altered behind the back of the cache.
+                LOG.warning('The archive of %s is missing or altered, removing it from the cache'
+                            % url)
+                del self._entries[url]
+                if filepath.exists():
+                    filepath.unlink()
+            else:
+                self._entries[url] = (entry[0], entry[1], time.time())
+            self._modified = True
+
+            return filepath if valid else None
+
+    def store(self, url, filepath):
+        """Move the archive located at *filepath*, downloaded from *url*, into the cache and return
+        its new filepath.
+
+        :rtype: pathlib.Path
+        """
+        digest = Manifest.hash(Path(filepath))
+        self._path.mkdir(parents=True, exist_ok=True)
+        archive = self._archive_path(digest)
+        size = os.stat(str(filepath)).st_size
+
+        with self._lock:
+            if archive.exists():
+                os.remove(str(filepath))
+            else:
+                shutil.move(str(filepath), str(archive))
+            self._load()[url] = (digest, size, time.time())
+            self._modified = True
+
+        return archive
+
+    def remove(self, url):
+        """Remove the archive downloaded from *url* from the cache, e.g., because it cannot be
+        extracted, along with the other URLs it was downloaded from."""
+        with self._lock:
+            entry = self._load().get(url)
+
+            if entry is None:
+                return
+
+            LOG.info('Removing the archive of %s from the cache' % url)
+            for u in [u for u, e in self._entries.items() if e[0] == entry[0]]:
+                del self._entries[u]
+            self._modified = True
+
+            try:
+                os.remove(str(self._archive_path(entry[0])))
+            except FileNotFoundError:
+                pass
+
+    def save(self):
+        """Evict the least recently used archives until the size of the cache is within its limit,
+        then write the index, if one of its entries was changed since it was loaded."""
+        with self._lock:
+            self._evict()
+
+            if not self._modified:
+                return
+
+            config = configparser.ConfigParser(interpolation=None)
+
+            for url, (sha256, size, used) in sorted(self._entries.items()):
+                config[url] = {'sha256': sha256, 'size': str(size), 'used': repr(used)}
+
+            try:
+                self._path.mkdir(parents=True, exist_ok=True)
+                fd, name = tempfile.mkstemp(prefix='.%s.' % self.FILENAME, dir=str(self._path))
+                with open(fd, mode='w', encoding='utf-8') as f:
+                    config.write(f)
+                os.replace(name, str(self.filepath))
+            except OSError as e:
+                LOG.warning('Unable to save the archive cache (%s): %s' % (self.filepath, e))
+            else:
+                self._modified = False
+
+    def _archive_path(self, sha256):
+        return self._path.joinpath('%s.tar.gz' % sha256)
+
+    def _archives(self):
+        """Return a :py:obj:`dict` that maps the digest of each archive to the last time it was
+        used and its size."""
+        archives = dict()
+
+        for sha256, size, used in self._load().values():
+            archives[sha256] = (max(used, archives.get(sha256, (used,))[0]), size)
+
+        return archives
+
+    def _evict(self):
+        archives = self._archives()
+        size = sum(s for _, s in archives.values())
+
+        for sha256, (_, s) in sorted(archives.items(), key=lambda a: a[1][0]):
+            if size <= self._max_size:
+                break
+
+            LOG.info('Evicting the archive %s from the cache' % sha256)
+            try:
+                os.remove(str(self._archive_path(sha256)))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                LOG.warning('Unable to evict the archive %s: %s' % (sha256, e))
+                continue
+
+            size -= s
+            for url in [u for u, e in self._entries.items() if e[0] == sha256]:
+                del self._entries[url]
+            self._modified = True
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+
+        self._entries = dict()
+        config = configparser.ConfigParser(interpolation=None)
+
+        try:
+            with self.filepath.open(mode='r', encoding='utf-8') as f:
+                config.read_file(f)
+        except FileNotFoundError:
+            return self._entries
+        except (OSError, configparser.Error) as e:
+            LOG.warning('Unable to read the archive cache (%s): %s' % (self.filepath, e))
+            return self._entries
+
+        for url in config.sections():
+            section = config[url]
+            try:
+                self._entries[url] = (section['sha256'], int(section['size']),
+                                      float(section['used']))
+            except (KeyError, ValueError):
+                # an invalid entry is simply ignored and will be refreshed on the next store.
+                continue
+
+        return self._entries
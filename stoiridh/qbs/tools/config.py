@@ -19,9 +19,16 @@
 ####################################################################################################
 import asyncio
 import configparser
+import io
+import os
+import stat
+import sys
+import tempfile
+import threading
 
 from collections import OrderedDict
 from pathlib import Path
+from .filelock import FileLock
 
 
 class Config:
@@ -60,7 +67,12 @@ class Config:
         want to update them. This is done with a call to the :ref:`coroutine <coroutine>` method,
         :py:meth:`update`.
         """
-        self._config = configparser.ConfigParser(interpolation=configparser.ExtendedInterpolation())
+        self._config = self._parser()
+        # whether the parsed configuration file is shared with the other Config objects through
+        # the cache, in which case it is copied before being updated.
+        self._shared = False
+        # sections updated since the configuration file was opened.
+        self._dirty = set()
 
         if loop is None or not isinstance(loop, asyncio.BaseEventLoop):
             self._loop = asyncio.get_event_loop()
@@ -78,6 +90,9 @@ class Config:
         if not self._path.is_dir():
             raise ValueError("argument (path) is not a directory.")
 
+        # held by the processes while they write the configuration file.
+        self._lock = FileLock(self._path.joinpath('.%s.lock' % self.FILENAME))
+
     @property
     def path(self):
         """This read-only property returns the path where the configuration file is located.
@@ -86,23 +101,59 @@ class Config:
         """
         return self._path
 
+    @property
+    def lock(self):
+        """This read-only property returns the :py:class:`~stoiridh.qbs.tools.FileLock` object held
+        while the configuration file is written, so that several processes may update it at the
+        same time.
+
+        :rtype: ~stoiridh.qbs.tools.FileLock
+        """
+        return self._lock
+
+    @property
+    def dirty(self):
+        """This read-only property returns a :py:obj:`frozenset` containing the sections that were
+        changed since the configuration file was opened. The configuration file is only written
+        when the set is not empty.
+
+        :rtype: frozenset
+        """
+        return frozenset(self._dirty)
+
     def open(self):
         """Open and read the data from the configuration file.
 
+        The configuration file is read and parsed in the executor of the loop, so that the loop is
+        not blocked. The returned object may be awaited, in order to get the
+        :py:class:`~stoiridh.qbs.tools.Config` object once it is read, or used directly as an
+        :term:`asynchronous context manager`.
+
+        The parsed configuration file is shared by the :py:class:`~stoiridh.qbs.tools.Config`
+        objects of the process, so it is only parsed again once it changed on the disk, according
+        to its modification time, its size, and its inode. It is copied by the first
+        :py:meth:`update`.
+
         Example::
 
             async with config.open() as cfg:
                 data = await cfg.read('qbs')
 
-        :rtype: ~stoiridh.qbs.tools.Config
-        """
-        self._filepath = self._path.joinpath(self.FILENAME)
+            async with await config.open() as cfg:
+                data = await cfg.read('qbs')
 
-        if self._filepath.exists():
-            with self._filepath.open(mode='r', encoding='utf-8') as fd:
-                self._config.read_file(fd)
+            cfg = await config.open()
+            data = await cfg.read('qbs')
 
-        return self
+        .. note::
+            The :py:class:`~stoiridh.qbs.tools.Config` object is no longer returned directly, so
+            the returned object must be awaited, or entered with ``async with``, before the data
+            are read or updated.
+
+        :rtype: :term:`awaitable` returning a :py:class:`~stoiridh.qbs.tools.Config` object, which
+                is also an :term:`asynchronous context manager`
+        """
+        return _Opening(self)
 
     async def read(self, section):
         """Return the data associated to *section* and return them under the form of a
@@ -113,7 +164,8 @@ class Config:
 
         :rtype: dict
         """
-        return await self._loop.run_in_executor(None, self._read, section)
+        # the data are already in memory, so they are not worth a thread.
+        return self._read(section)
 
     async def update(self, section, data, reset=False):
         """Update the *data* associated to the corresponding *section*. If *section* doesn't exists,
@@ -123,8 +175,37 @@ class Config:
 
         If *reset* is :py:data:`True`, all data from the *section* will be overwritten by the new
         *data*.
+
+        The *section* is only marked as :py:attr:`dirty` when its data actually change. When the
+        context manager exits, the dirty sections are applied on top of the configuration file, as
+        written by the other processes in the meantime, while the :py:attr:`lock` is held. The
+        configuration file is then written into a temporary file, flushed to the disk, and renamed
+        over the previous one, so that a reader never sees a torn file. The file is written in the
+        executor of the loop.
+
+        .. note::
+            :py:meth:`read` and :py:meth:`update` only use the data read by :py:meth:`open`, so
+            they are run directly on the loop.
         """
-        await self._loop.run_in_executor(None, self._update, section, data, reset)
+        self._update(section, data, reset)
+
+    async def _open(self):
+        self._filepath = self._path.joinpath(self.FILENAME)
+        self._dirty.clear()
+        # the sections removed by the other processes must not be kept.
+        self._config = await self._loop.run_in_executor(None, self._read_file)
+        self._shared = True
+        return self
+
+    def _read_file(self):
+        """Return the parsed configuration file, which is shared and must not be modified."""
+        return _cache.get(self._filepath, self._parser)
+
+    def _own(self):
+        """Copy the parsed configuration file, unless it is already owned by this object."""
+        if self._shared:
+            self._config = self._copy(self._config)
+            self._shared = False
 
     def _read(self, section):
         if not self._config.has_section(section):
@@ -138,29 +219,189 @@ class Config:
         return data
 
     def _update(self, section, data, reset):
-        if not self._config.has_section(section) or reset:
-            self._config[section] = dict()
-
-        if isinstance(data, (dict, OrderedDict)):
-            for option, value in data.items():
-                self._config[section][option] = value
-        else:
-            raise TypeError('''argument (data) should be either a dictionary or an object, not
-                               %r''' % type(data))
+        self._own()
+        before = self._snapshot(section)
+
+        try:
+            if not self._config.has_section(section) or reset:
+                self._config[section] = dict()
+
+            if isinstance(data, (dict, OrderedDict)):
+                for option, value in data.items():
+                    self._config[section][option] = value
+            else:
+                raise TypeError('''argument (data) should be either a dictionary or an object,
+                                   not %r''' % type(data))
+        finally:
+            # a section may be reset before the data are found to be invalid.
+            if self._snapshot(section) != before:
+                self._dirty.add(section)
+
+    def _snapshot(self, section):
+        """Return the raw options of *section*, or :py:obj:`None` if *section* is empty, since the
+        empty sections are not written."""
+        if not self._config.has_section(section):
+            return None
+        return self._options(self._config, section) or None
+
+    def _commit(self):
+        """Apply the dirty sections on top of the configuration file, as written by the other
+        processes since it was opened, then write it.
+
+        The lock is only held while the configuration file is merged and written, so the processes
+        reading it are not serialised, since the file is replaced atomically."""
+        with self._lock:
+            config = self._copy(self._read_file())
+
+            for section in self._dirty:
+                if self._config.has_section(section):
+                    config[section] = self._options(self._config, section)
+                else:
+                    config.remove_section(section)
+
+            self._write(config)
+            # the other changes become visible as well, to this object and the other ones.
+            _cache.put(self._filepath, config)
+
+        self._config = config
+        self._shared = True
+
+    def _write(self, config):
+        """Write *config* into the configuration file atomically, so that a reader never sees a
+        torn file."""
+        fd, name = tempfile.mkstemp(prefix='.%s.' % self.FILENAME, dir=str(self._path))
+
+        try:
+            with open(fd, mode='w', encoding='utf-8') as f:
+                config.write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            if self._filepath.exists():
+                os.chmod(name, stat.S_IMODE(os.stat(str(self._filepath)).st_mode))
+            else:
+                os.chmod(name, 0o644)
+            os.replace(name, str(self._filepath))
+        except:
+            os.remove(name)
+            raise
+
+        # the directories cannot be opened under Windows.
+        if not sys.platform.startswith('win32'):
+            fd = os.open(str(self._path), os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    @staticmethod
+    def _options(config, section):
+        """Return the raw options of *section* in *config*, without the ones it inherits from the
+        ``DEFAULT`` section, which would otherwise be written into *section*."""
+        defaults = config.defaults()
+        return {option: value for option, value in config.items(section, raw=True)
+                if option not in defaults or value != defaults[option]}
+
+    @staticmethod
+    def _parser():
+        return configparser.ConfigParser(interpolation=configparser.ExtendedInterpolation())
+
+    @classmethod
+    def _copy(cls, config):
+        """Return a copy of *config*, whose values are copied as they are written, i.e., without
+        being interpolated."""
+        buffer = io.StringIO()
+        config.write(buffer)
+        buffer.seek(0)
+
+        copy = cls._parser()
+        copy.read_file(buffer)
+        return copy
 
     async def __aenter__(self):
         # there are no extra work to do, since we have already read and parse the configuration file
-        # from the coroutine method, *open*.
+        # when *open* was awaited.
         return self
 
     async def __aexit__(self, exc_type, exc_value, traceback):
         if exc_type is None:
-            # remove the empty sections.
-            for section in self._config.sections():
-                if len(self._config[section]) == 0:
-                    self._config.remove_section(section)
-            # update the configuration file with the new values.
-            with self._filepath.open(mode='w', encoding='utf-8') as fd:
-                self._config.write(fd)
+            # remove the empty sections, which may only be found in an updated configuration.
+            if not self._shared:
+                for section in self._config.sections():
+                    if not self._options(self._config, section):
+                        self._config.remove_section(section)
+            # update the configuration file with the new values, unless the configuration file was
+            # only read, as it is by most of the processes.
+            if self._dirty:
+                await self._loop.run_in_executor(None, self._commit)
+                self._dirty.clear()
         else:
             return False
+
+
+class _Opening:
+    def __init__(self, config):
+        """Awaitable, and asynchronous context manager, returned by :py:meth:`Config.open`, that
+        reads the configuration file of *config* off the loop."""
+        self._config = config
+
+    def __await__(self):
+        return self._config._open().__await__()
+
+    async def __aenter__(self):
+        await self._config._open()
+        return await self._config.__aenter__()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        return await self._config.__aexit__(exc_type, exc_value, traceback)
+
+
+class _ConfigCache:
+    def __init__(self):
+        """Process-wide registry of the parsed configuration files, keyed by their filepath, so that
+        a configuration file is only parsed again once it changed on the disk, according to its
+        modification time, its size, and its inode, since it is replaced by a rename."""
+        self._lock = threading.Lock()
+        self._entries = dict()
+        self._parses = 0
+
+    @property
+    def parses(self):
+        """Return the number of configuration files parsed so far."""
+        return self._parses
+
+    def get(self, filepath, factory):
+        """Return the parsed configuration file located at *filepath*, which is shared and must not
+        be modified, or a new parser returned by *factory* if the file does not exist."""
+        with self._lock:
+            try:
+                f = filepath.open(mode='r', encoding='utf-8')
+            except FileNotFoundError:
+                self._entries.pop(filepath, None)
+                return factory()
+
+            with f:
+                # the status of the file that is read, rather than the one found at filepath.
+                stamp = self._stamp(os.fstat(f.fileno()))
+                entry = self._entries.get(filepath)
+                if entry is not None and entry[0] == stamp:
+                    return entry[1]
+
+                config = factory()
+                config.read_file(f)
+                self._parses += 1
+
+            self._entries[filepath] = (stamp, config)
+            return config
+
+    def put(self, filepath, config):
+        """Share *config*, which was just written into *filepath*."""
+        with self._lock:
+            self._entries[filepath] = (self._stamp(os.stat(str(filepath))), config)
+
+    @staticmethod
+    def _stamp(st):
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+# the cache shared by the Config objects of the process.
+_cache = _ConfigCache()
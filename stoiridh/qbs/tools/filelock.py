@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+import os
+
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    def __init__(self, path):
+        """Construct a :py:class:`FileLock` object.
+
+        The lock is held by at most one process of the host at the same time, and by at most one
+        :py:class:`FileLock` object within a process, so that several processes using the same
+        files, e.g., several build jobs installing the :py:class:`~stoiridh.qbs.tools.SDK`, do not
+        collide. The lock is released by the operating system when the process holding it exits,
+        so a crashed process does not leave the lock behind.
+
+        Parameters:
+
+        - *path*, corresponds to the filepath of the lock file, which is created if it does not
+          exist.
+
+        :raise: :py:exc:`TypeError` when *path* is not a :py:class:`str` object or a
+                :py:class:`pathlib.Path` object.
+        """
+        if isinstance(path, str):
+            self._path = Path(path)
+        elif isinstance(path, Path):
+            self._path = path
+        else:
+            raise TypeError("argument (path) should be a str or pathlib.Path object, not %r"
+                            % type(path))
+
+        self._fd = None
+
+    @property
+    def path(self):
+        """This read-only property returns the filepath of the lock file.
+
+        :rtype: pathlib.Path
+        """
+        return self._path
+
+    @property
+    def locked(self):
+        """This read-only property returns :py:obj:`True` if the lock is held by this object."""
+        return self._fd is not None
+
+    def acquire(self, blocking=True):
+        """Acquire the lock and return :py:obj:`True`.
+
+        If *blocking* is :py:obj:`False` and the lock is held by another process, or by another
+        object, then :py:obj:`False` is returned rather than waiting for it to be released.
+
+        :raise: :py:exc:`RuntimeError` when the lock is already held by this object.
+        """
+        if self._fd is not None:
+            raise RuntimeError('The lock (%s) is already acquired' % self._path)
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(self._path), os.O_RDWR | os.O_CREAT, 0o644)
+
+        try:
+            if not self._lock(fd, blocking):
+                os.close(fd)
+                return False
+        except:
+            os.close(fd)
+            raise
+
+        self._fd = fd
+        return True
+
+    def release(self):
+        """Release the lock.
+
+        :raise: :py:exc:`RuntimeError` when the lock is not held by this object.
+        """
+        if self._fd is None:
+            raise RuntimeError('The lock (%s) is not acquired' % self._path)
+
+        fd, self._fd = self._fd, None
+
+        try:
+            self._unlock(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _lock(fd, blocking):
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            return True
+
+        # the first byte of the file is locked, whatever its size.
+        mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+        while True:
+            try:
+                msvcrt.locking(fd, mode, 1)
+            except OSError:
+                if not blocking:
+                    return False
+                # LK_LOCK gives up after 10 attempts, one per second.
+                continue
+            return True
+
+    @staticmethod
+    def _unlock(fd):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def __repr__(self):
+        return '<%s path=%s locked=%s>' % (self.__class__.__name__, self._path, self.locked)
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+import hashlib
+import os
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+class Manifest:
+    FILENAME = '.manifest'
+    HEADER = '# Stoiridh Qbs Tools manifest 1'
+    # maximum number of files hashed at the same time, or None for the default of
+    # concurrent.futures.ThreadPoolExecutor.
+    WORKERS = None
+
+    # reasons of the failures reported by verify()
+    MISSING = 'missing'
+    SIZE = 'size'
+    MTIME = 'mtime'
+    HASH = 'hash'
+
+    def __init__(self, entries=None):
+        """Construct a :py:class:`Manifest` object.
+
+        The manifest records the size, the modification time, and the SHA-256 digest of each file
+        of an installed package of the :py:class:`~stoiridh.qbs.tools.SDK`, so that the package can
+        be checked afterwards.
+
+        *entries* is an optional :py:obj:`dict` that maps the path of each file, relative to the
+        directory of the package and separated with ``/``, to a tuple ``(size, mtime_ns,
+        sha256)``.
+        """
+        self._entries = dict(entries or {})
+
+    @property
+    def entries(self):
+        """This read-only property returns a :py:obj:`dict` that maps the relative path of each
+        file to a tuple ``(size, mtime_ns, sha256)``."""
+        return self._entries
+
+    @classmethod
+    def build(cls, path, workers=None):
+        """Return the manifest of the files located in the *path* directory, hashed by up to
+        *workers* threads.
+
+        :rtype: Manifest
+        """
+        files = list(cls._walk(path))
+
+        with ThreadPoolExecutor(max_workers=workers or cls.WORKERS) as executor:
+            digests = executor.map(cls.hash, (Path(path, f) for f in files))
+            entries = dict()
+            for f, digest in zip(files, digests):
+                st = os.stat(str(Path(path, f)))
+                entries[f] = (st.st_size, st.st_mtime_ns, digest)
+
+        return cls(entries)
+
+    @classmethod
+    def read(cls, filepath):
+        """Return the manifest read from *filepath*.
+
+        :raise: :py:exc:`ValueError` when *filepath* is not a valid manifest.
+        :rtype: Manifest
+        """
+        entries = dict()
+
+        with Path(filepath).open(mode='r', encoding='utf-8') as f:
+            if f.readline().rstrip('\n') != cls.HEADER:
+                raise ValueError('%s is not a manifest' % filepath)
+            for line in f:
+                try:
+                    digest, size, mtime, name = line.rstrip('\n').split(' ', 3)
+                    entries[name] = (int(size), int(mtime), digest)
+                except ValueError:
+                    raise ValueError('%s: invalid line: %r' % (filepath, line)) from None
+
+        return cls(entries)
+
+    def write(self, filepath):
+        """Write the manifest into *filepath*, atomically."""
+        filepath = Path(filepath)
+        fd, name = tempfile.mkstemp(prefix='%s.' % filepath.name, dir=str(filepath.parent))
+
+        try:
+            with open(fd, mode='w', encoding='utf-8') as f:
+                f.write(self.HEADER + '\n')
+                for n, (size, mtime, digest) in sorted(self._entries.items()):
+                    f.write('%s %d %d %s\n' % (digest, size, mtime, n))
+            os.replace(name, str(filepath))
+        except:
+            os.remove(name)
+            raise
+
+    def verify(self, path, hash=False, workers=None):
+        """Check the files of the manifest against the ones located in the *path* directory and
+        return a sorted :py:obj:`list` of tuples ``(name, reason)`` for each file that does not
+        match, where *reason* is :py:attr:`MISSING`, :py:attr:`SIZE`, :py:attr:`MTIME`, or
+        :py:attr:`HASH`.
+
+        The sizes and the modification times are checked first. If *hash* is :py:obj:`True`, then
+        the files of the right size are also hashed, by up to *workers* threads, and those whose
+        digest matches are not reported even if their modification time changed.
+        """
+        failures = []
+        candidates = []
+
+        for name, (size, mtime, digest) in self._entries.items():
+            try:
+                st = os.stat(str(Path(path, name)))
+            except OSError:
+                failures.append((name, self.MISSING))
+                continue
+
+            if st.st_size != size:
+                failures.append((name, self.SIZE))
+            elif hash:
+                candidates.append(name)
+            elif st.st_mtime_ns != mtime:
+                failures.append((name, self.MTIME))
+
+        if candidates:
+            with ThreadPoolExecutor(max_workers=workers or self.WORKERS) as executor:
+                digests = executor.map(self._hash_or_none, (Path(path, n) for n in candidates))
+                failures.extend((n, self.HASH) for n, d in zip(candidates, digests)
+                                if d != self._entries[n][2])
+
+        return sorted(failures)
+
+    @classmethod
+    def _walk(cls, path):
+        for root, dirs, files in os.walk(str(path)):
+            dirs.sort()
+            for f in sorted(files):
+                name = Path(root, f).relative_to(path).as_posix()
+                if name != cls.FILENAME:
+                    yield name
+
+    @staticmethod
+    def hash(filepath):
+        """Return the SHA-256 digest of the file located at *filepath*, as a hexadecimal string."""
+        digest = hashlib.sha256()
+
+        with filepath.open(mode='rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    @classmethod
+    def _hash_or_none(cls, filepath):
+        # the file may be removed while the package is verified.
+        try:
+            return cls.hash(filepath)
+        except OSError:
+            return None
+
+    def __eq__(self, other):
+        if not isinstance(other, Manifest):
+            return NotImplemented
+        return self._entries == other._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return '<%s files=%d>' % (self.__class__.__name__, len(self._entries))
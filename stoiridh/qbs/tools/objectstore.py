@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+import logging
+import os
+import shutil
+import threading
+
+from pathlib import Path
+from .manifest import Manifest
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+
+
+# logging
+LOG = logging.getLogger(__name__)
+
+
+class ObjectStore:
+    # ioctl request that clones a file on GNU/Linux, i.e., btrfs, XFS, etc.
+    FICLONE = 0x40049409
+
+    def __init__(self, path):
+        """Construct an :py:class:`ObjectStore` object.
+
+        The store holds the content of each file installed by the
+        :py:class:`~stoiridh.qbs.tools.SDK` once, under the name of its SHA-256 digest. The files of
+        the installed packages are links to the objects of the store, so that a file shared by
+        several versions of the SDK is only stored once.
+
+        A file is linked to its object by a reflink, if the filesystem supports it, so that the
+        file remains independent of the object. Otherwise, it is a hard link, or a plain copy if
+        the store is located on another filesystem.
+
+        Parameters:
+
+        - *path*, corresponds to the directory of the store. Generally speaking, this is the
+          ``objects`` subdirectory of the :py:attr:`~stoiridh.qbs.tools.SDK.install_root_path`
+          directory.
+
+        :raise: :py:exc:`TypeError` when *path* is not a :py:class:`str` object or a
+                :py:class:`pathlib.Path` object.
+        """
+        if isinstance(path, str):
+            self._path = Path(path)
+        elif isinstance(path, Path):
+            self._path = path
+        else:
+            raise TypeError("argument (path) should be a str or pathlib.Path object, not %r"
+                            % type(path))
+
+        # whether the filesystem may support the reflinks, until a reflink fails.
+        self._reflinks = fcntl is not None
+
+    @property
+    def path(self):
+        """This read-only property returns the directory of the store.
+
+        :rtype: pathlib.Path
+        """
+        return self._path
+
+    def object_path(self, digest):
+        """Return the filepath of the object of *digest*.
+
+        :rtype: pathlib.Path
+        """
+        return self._path.joinpath(digest[:2], digest)
+
+    def deduplicate(self, path, manifest=None):
+        """Replace each file located in the *path* directory by a link to the object of the same
+        content, the files whose content is not stored yet becoming new objects, and return the
+        :py:class:`~stoiridh.qbs.tools.Manifest` of the directory.
+
+        If *manifest* is given, then it is used rather than hashing the files again.
+
+        :rtype: ~stoiridh.qbs.tools.Manifest
+        """
+        if manifest is None:
+            manifest = Manifest.build(path)
+
+        entries = dict()
+
+        for name, (size, mtime, digest) in manifest.entries.items():
+            filepath = Path(path, name)
+            obj = self.object_path(digest)
+
+            if obj.exists():
+                self._link(obj, filepath)
+            else:
+                obj.parent.mkdir(parents=True, exist_ok=True)
+                self._link(filepath, obj)
+
+            # the linked file may have the modification time of the object.
+            st = os.stat(str(filepath))
+            entries[name] = (st.st_size, st.st_mtime_ns, digest)
+
+        return Manifest(entries)
+
+    def _link(self, src, dst):
+        """Replace *dst* by a link to *src*, atomically."""
+        # several packages may store the same object at the same time.
+        temp = dst.with_name('.%s.%d.link' % (dst.name, threading.get_ident()))
+
+        try:
+            if not self._reflink(src, temp):
+                try:
+                    os.link(str(src), str(temp))
+                except OSError as e:
+                    LOG.debug('Unable to link %s to %s (%s), copying it' % (dst, src, e))
+                    shutil.copy2(str(src), str(temp))
+            os.replace(str(temp), str(dst))
+        except:
+            if temp.exists():
+                temp.unlink()
+            raise
+
+    def _reflink(self, src, dst):
+        """Clone *src* into *dst* and return :py:obj:`True`, or return :py:obj:`False` if the
+        filesystem does not support it."""
+        if not self._reflinks:
+            return False
+
+        with src.open(mode='rb') as s, dst.open(mode='wb') as d:
+            try:
+                fcntl.ioctl(d.fileno(), self.FICLONE, s.fileno())
+            except OSError:
+                cloned = False
+            else:
+                cloned = True
+
+        if cloned:
+            shutil.copystat(str(src), str(dst))
+        else:
+            dst.unlink()
+            self._reflinks = False
+
+        return cloned
+
+    def __repr__(self):
+        return '<%s path=%s>' % (self.__class__.__name__, self._path)
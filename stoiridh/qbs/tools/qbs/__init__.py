@@ -1,3 +1,5 @@
 # -*- coding: utf-8 -*-
 from .qbs import Qbs
+from .cache import ScanCache
+from .inventory import Inventory
 from .scanner import Scanner
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+import configparser
+import logging
+import os
+import tempfile
+
+from pathlib import Path
+from .. import VersionNumber
+
+
+# logging
+LOG = logging.getLogger(__name__)
+
+
+class ScanCache:
+    FILENAME = 'qbs.cache'
+
+    def __init__(self, path):
+        """Construct a :py:class:`ScanCache` object.
+
+        The cache maps each Qbs executable found by the :py:class:`~stoiridh.qbs.tools.qbs.Scanner`
+        to its version number, or to :py:obj:`None` if the executable did not display a valid
+        version number, so that a broken executable is not spawned again either. An entry is
+        identified by the path, the inode, the size, and the modification time of the executable,
+        so that it is only refreshed when one of them changes.
+
+        Parameters:
+
+        - *path*, corresponds to the directory where the cache file is stored. Generally speaking,
+          this is the :py:attr:`~stoiridh.qbs.tools.SDK.install_root_path` directory, next to the
+          configuration file.
+
+        :raise: :py:exc:`TypeError` when *path* is not a :py:class:`str` object or a
+                :py:class:`pathlib.Path` object.
+        """
+        if isinstance(path, str):
+            self._path = Path(path)
+        elif isinstance(path, Path):
+            self._path = path
+        else:
+            raise TypeError("argument (path) should be a str or pathlib.Path object, not %r"
+                            % type(path))
+
+        self._entries = None
+        self._modified = False
+
+    @property
+    def path(self):
+        """This read-only property returns the path where the cache file is located.
+
+        :rtype: pathlib.Path
+        """
+        return self._path
+
+    @property
+    def filepath(self):
+        """This read-only property returns the filepath of the cache file.
+
+        :rtype: pathlib.Path
+        """
+        return self._path.joinpath(self.FILENAME)
+
+    def lookup(self, executable, default=None):
+        """Return the version number of *executable* if the cache holds an entry that matches its
+        current identity, which is :py:obj:`None` if the executable did not display a valid version
+        number; otherwise, return *default*.
+
+        :rtype: ~stoiridh.qbs.tools.VersionNumber or :py:obj:`None`
+        """
+        identity = self._identity(executable)
+
+        if identity is None:
+            return default
+
+        entry = self._load().get(identity[0])
+
+        if entry is not None and entry[0] == identity:
+            return entry[1]
+
+        return default
+
+    def store(self, executable, version):
+        """Associate *version* to the current identity of *executable*, or :py:obj:`None` if the
+        executable did not display a valid version number."""
+        identity = self._identity(executable)
+
+        if identity is not None:
+            self._load()[identity[0]] = (identity, version)
+            self._modified = True
+
+    def save(self):
+        """Write the cache file, if one of its entries was stored since it was loaded."""
+        if not self._modified:
+            return
+
+        config = configparser.ConfigParser(interpolation=None)
+
+        for key, (identity, version) in sorted(self._entries.items()):
+            config[key] = {'inode': str(identity[1]),
+                           'size': str(identity[2]),
+                           'mtime': str(identity[3]),
+                           'version': str(version) if version is not None else ''}
+
+        try:
+            self._path.mkdir(parents=True, exist_ok=True)
+            fd, name = tempfile.mkstemp(prefix='.%s.' % self.FILENAME, dir=str(self._path))
+            with open(fd, mode='w', encoding='utf-8') as f:
+                config.write(f)
+            os.replace(name, str(self.filepath))
+        except OSError as e:
+            LOG.warning('Unable to save the scan cache (%s): %s' % (self.filepath, e))
+        else:
+            self._modified = False
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+
+        self._entries = dict()
+        config = configparser.ConfigParser(interpolation=None)
+
+        try:
+            with self.filepath.open(mode='r', encoding='utf-8') as f:
+                config.read_file(f)
+        except FileNotFoundError:
+            return self._entries
+        except (OSError, configparser.Error) as e:
+            LOG.warning('Unable to read the scan cache (%s): %s' % (self.filepath, e))
+            return self._entries
+
+        for key in config.sections():
+            section = config[key]
+            try:
+                identity = (key, int(section['inode']), int(section['size']),
+                            int(section['mtime']))
+                version = section['version']
+                self._entries[key] = (identity, VersionNumber(version) if version else None)
+            except (KeyError, ValueError):
+                # an invalid entry is simply ignored and will be refreshed on the next store.
+                continue
+
+        return self._entries
+
+    @staticmethod
+    def _identity(executable):
+        filepath = os.path.abspath(str(executable))
+
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+
+        return (filepath, st.st_ino, st.st_size, st.st_mtime_ns)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+from . import Qbs
+from .. import VersionConstraint
+
+
+class Inventory:
+    def __init__(self, installations):
+        """Construct an :py:class:`Inventory` object.
+
+        An inventory is a read-only collection of :py:class:`~stoiridh.qbs.tools.qbs.Qbs` objects
+        as returned by the :py:meth:`~stoiridh.qbs.tools.qbs.Scanner.scan_all` method. The
+        installations are ranked from the highest version to the lowest one. When two installations
+        share the same version, they keep the order in which *installations* were given, that is to
+        say, the order in which they were found.
+
+        :raise: :py:exc:`TypeError` when an item of *installations* is not a
+                :py:class:`~stoiridh.qbs.tools.qbs.Qbs` object.
+        """
+        installations = list(installations)
+
+        for qbs in installations:
+            if not isinstance(qbs, Qbs):
+                raise TypeError('''argument (installations) should only contain
+                                   stoiridh.qbs.tools.qbs.Qbs objects, not %r''' % type(qbs))
+
+        self._installations = sorted(installations, key=lambda qbs: qbs.version, reverse=True)
+
+    def matches(self, constraint):
+        """Return the list of installations whose version satisfies *constraint*, in the order of
+        the inventory.
+
+        *constraint* is either a :py:class:`~stoiridh.qbs.tools.VersionConstraint` object, an
+        expression, or a :py:class:`~stoiridh.qbs.tools.VersionNumber` object corresponding to the
+        minimum version.
+
+        :rtype: list
+        """
+        constraint = VersionConstraint.parse(constraint)
+        return [qbs for qbs in self._installations if qbs.version in constraint]
+
+    def best_match(self, constraint):
+        """Return the installation with the highest version that satisfies *constraint*. If there
+        is no such installation, then a :py:obj:`None` type is returned.
+
+        No process is spawned, since the versions were already retrieved by the scanner.
+
+        :rtype: :py:class:`~stoiridh.qbs.tools.qbs.Qbs` or :py:obj:`None`
+        """
+        matches = self.matches(constraint)
+        return matches[0] if matches else None
+
+    def __len__(self):
+        return len(self._installations)
+
+    def __iter__(self):
+        return iter(self._installations)
+
+    def __getitem__(self, index):
+        return self._installations[index]
+
+    def __repr__(self):
+        return '<%s installations=%r>' % (self.__class__.__name__, self._installations)
@@ -26,24 +26,47 @@ import sys
 
 from pathlib import Path
 from . import Qbs
-from .. import VersionNumber
+from .cache import ScanCache
+from .inventory import Inventory
+from .. import VersionConstraint, VersionNumber
 
 
 # logging
 LOG = logging.getLogger(__name__)
 
+# the executables that are not in the cache, as opposed to the ones that displayed no version.
+_MISSING = object()
+
 
 class Scanner:
     # Qbs program displays his version number in this way b'1.5.0\n' preserving OS dependant
     # whitespace characters, here a newline.
     RE_QBS_VERSION = re.compile(r'^(?P<version>[\d\.\S]+)$')
+    # maximum number of bytes read from the standard output of the Qbs program, which is much more
+    # than the length of its version number.
+    MAX_OUTPUT_SIZE = 256
 
-    def __init__(self, minimum_version=VersionNumber('1.5.0')):
+    def __init__(self, minimum_version=VersionNumber('1.5.0'), cache=None, timeout=10,
+                 constraint=None):
         """Construct a :py:class:`Scanner` object.
 
         The scanner will perform a scan of the ``QBS_HOME`` and the ``PATH`` environment variables,
         respectively, in order to find the :term:`Qbs` executable according to the *minimum_version*
         parameter.
+
+        If *cache* is a :py:class:`~stoiridh.qbs.tools.qbs.ScanCache` object, then the version of
+        each executable is looked up into it before spawning the executable and the cache is saved
+        at the end of the scan. The executables that did not display a valid version number, e.g.,
+        because they timed out, are cached as well, so they are only spawned again once they
+        change.
+
+        *timeout* corresponds to the number of seconds given to each executable in order to display
+        its version number. When the delay expires, the executable is killed and ignored. If
+        :py:obj:`None`, then there is no timeout.
+
+        If *constraint* is given, either as a :py:class:`~stoiridh.qbs.tools.VersionConstraint`
+        object or as an expression, then the Qbs executable must satisfy it instead of the
+        *minimum_version* parameter.
         """
         if isinstance(minimum_version, VersionNumber):
             self._minimum_version = minimum_version
@@ -52,71 +75,290 @@ class Scanner:
                             stoiridh.qbs.tools.VersionNumber object, not %r'''
                             % type(minimum_version))
 
+        if cache is None or isinstance(cache, ScanCache):
+            self._cache = cache
+        else:
+            raise TypeError('''argument (cache) should be a
+                            stoiridh.qbs.tools.qbs.ScanCache object, not %r''' % type(cache))
+
+        self._timeout = timeout
+
+        if constraint is None:
+            self._constraint = VersionConstraint.parse(self._minimum_version)
+        else:
+            self._constraint = VersionConstraint.parse(constraint)
+            self._minimum_version = self._constraint.minimum
+
     @property
     def minimum_version(self):
         """This read-only property returns the minimum version required by the scanner in order to
         find the Qbs executable.
 
+        When the scanner was constructed with a *constraint*, this is the smallest version that may
+        satisfy it, or :py:obj:`None` if the constraint has no lower bound.
+
         :rtype: ~stoiridh.qbs.tools.VersionNumber
         """
         return self._minimum_version
 
-    async def scan(self, loop=None):
+    @property
+    def constraint(self):
+        """This read-only property returns the constraint that the Qbs executable must satisfy.
+
+        :rtype: ~stoiridh.qbs.tools.VersionConstraint
+        """
+        return self._constraint
+
+    @property
+    def cache(self):
+        """This read-only property returns the cache used by the scanner, if any.
+
+        :rtype: ~stoiridh.qbs.tools.qbs.ScanCache or :py:obj:`None`
+        """
+        return self._cache
+
+    @property
+    def timeout(self):
+        """This read-only property returns the number of seconds given to each executable in order
+        to display its version number.
+
+        :rtype: int or float or :py:obj:`None`
+        """
+        return self._timeout
+
+    async def scan(self, loop=None, concurrency=1):
         """This :ref:`coroutine <coroutine>` method performs a scan from the ``QBS_HOME`` and the
         ``PATH`` environment variables in order to find the :term:`Qbs` executable according to the
-        :py:attr:`minimum_version` property.
+        :py:attr:`constraint` property.
 
         If the ``QBS_HOME`` environment variable is set, then the scanner will look into it first.
         When done and if no suitable version found, then the scanner will look into the ``PATH``
         environment variable. Once again, if there is no suitable version found, the scanner will
         return a :py:obj:`None` type; otherwise, a :py:class:`~Qbs` object.
 
+        If *concurrency* is greater than 1, then the candidates are looked up in one batch and up to
+        *concurrency* executables are spawned in parallel. The result is the same as the one of a
+        sequential scan.
+
         :rtype: :py:class:`~Qbs` or :py:obj:`None`
         """
         if loop is None:
             loop = asyncio.get_event_loop()
 
-        if sys.platform.startswith('win32'):
-            appname = 'qbs.exe'
-            sep = ';'
+        if concurrency > 1:
+            qbs = await self._scan_concurrently(concurrency, loop=loop)
         else:
-            appname = 'qbs'
-            sep = ':'
+            qbs = await self._scan_sequentially(loop=loop)
+
+        if self._cache is not None:
+            self._cache.save()
+
+        return qbs
+
+    async def scan_all(self, loop=None, paths=None, concurrency=1):
+        """This :ref:`coroutine <coroutine>` method performs a scan from the ``QBS_HOME`` and the
+        ``PATH`` environment variables, but also from the optional *paths* search roots, in order to
+        find every :term:`Qbs` executable, whatever its version is.
+
+        A search root may hold the Qbs executable either directly or within its ``bin``
+        subdirectory. When the same executable is reachable several times, e.g., through a symbolic
+        link or a repeated entry of the ``PATH`` environment variable, it is only kept once.
+
+        If *concurrency* is greater than 1, then up to *concurrency* executables are spawned in
+        parallel.
+
+        :rtype: :py:class:`~Inventory`
+        """
+        if loop is None:
+            loop = asyncio.get_event_loop()
+
+        home, candidates = self._candidates()
+
+        if home is not None:
+            candidates.insert(0, home)
+
+        for root in paths or []:
+            candidates.extend(Path(root, *parts) for parts in [('bin', self._appname()),
+                                                                (self._appname(),)])
+
+        apps = await loop.run_in_executor(None, self._unique_files, candidates)
+
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def probe(app):
+            async with semaphore:
+                return await self._probe_version(app, loop=loop)
+
+        versions = await asyncio.gather(*[probe(app) for app in apps])
+
+        if self._cache is not None:
+            self._cache.save()
+
+        return Inventory(Qbs(app, v) for app, v in zip(apps, versions) if v is not None)
+
+    async def _scan_sequentially(self, loop):
+        home, candidates = self._candidates()
 
         qbs = None
 
         # QBS_HOME environment variable has an highest priority than the PATH environment variable,
         # so we'll look into it first.
-        if 'QBS_HOME' in os.environ:
-            app = Path(os.environ['QBS_HOME'], 'bin', appname)
-            if app.is_file() and app.exists():
-                qbs = await self._spawn_process(app, loop=loop)
+        if home is not None:
+            if home.is_file() and home.exists():
+                qbs = await self._probe(home, loop=loop)
             else:
-                LOG.warning("%s was not found in the %s directory" % (app.name, app.parent))
+                LOG.warning("%s was not found in the %s directory" % (home.name, home.parent))
 
         if not qbs:
             # look into the PATH environment variable in order to find the Qbs executable.
-            for path in os.environ['PATH'].split(sep):
-                app = Path(path, appname)
+            for app in candidates:
                 if app.is_file() and app.exists():
-                    qbs = await self._spawn_process(app, loop=loop)
+                    qbs = await self._probe(app, loop=loop)
                     if qbs:
                         break
 
         return qbs or None
 
+    async def _scan_concurrently(self, concurrency, loop):
+        home, candidates = self._candidates()
+
+        if home is not None:
+            candidates.insert(0, home)
+
+        # stat all the candidates at once rather than one by one between two spawned processes.
+        apps = await loop.run_in_executor(None, self._existing_files, candidates)
+
+        if home is not None and (not apps or apps[0] is not home):
+            LOG.warning("%s was not found in the %s directory" % (home.name, home.parent))
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def probe(app):
+            async with semaphore:
+                return await self._probe(app, loop=loop)
+
+        futures = [asyncio.ensure_future(probe(app)) for app in apps]
+
+        try:
+            # the futures are awaited in the order of the sequential scan, so that its result is
+            # preserved whatever the order of completion is.
+            for future in futures:
+                qbs = await future
+                if qbs:
+                    return qbs
+        finally:
+            # the remaining probes are no longer needed, their processes are killed as soon as
+            # they are cancelled.
+            for future in futures:
+                future.cancel()
+            await asyncio.gather(*futures, return_exceptions=True)
+
+        return None
+
+    @staticmethod
+    def _appname():
+        return 'qbs.exe' if sys.platform.startswith('win32') else 'qbs'
+
+    @classmethod
+    def _candidates(cls):
+        """Return the candidate from the ``QBS_HOME`` environment variable, if any, and the list of
+        candidates from the ``PATH`` environment variable."""
+        appname = cls._appname()
+        sep = ';' if sys.platform.startswith('win32') else ':'
+
+        home = None
+
+        if 'QBS_HOME' in os.environ:
+            home = Path(os.environ['QBS_HOME'], 'bin', appname)
+
+        return home, [Path(path, appname) for path in os.environ.get('PATH', '').split(sep)]
+
+    @staticmethod
+    def _existing_files(candidates):
+        return [app for app in candidates if app.is_file()]
+
+    @staticmethod
+    def _unique_files(candidates):
+        apps = []
+        resolved = set()
+
+        for app in candidates:
+            if app.is_file():
+                realpath = os.path.normcase(os.path.realpath(str(app)))
+                if realpath not in resolved:
+                    resolved.add(realpath)
+                    apps.append(app)
+
+        return apps
+
+    async def _probe(self, executable, loop):
+        version = await self._probe_version(executable, loop=loop)
+
+        if version is not None and version in self._constraint:
+            return Qbs(executable, version)
+
+        return None
+
+    async def _probe_version(self, executable, loop):
+        if self._cache is not None:
+            version = self._cache.lookup(executable, _MISSING)
+            if version is not _MISSING:
+                return version
+
+        try:
+            version = await self._spawn_process(executable, loop=loop)
+        except OSError as e:
+            # the executable was not spawned, e.g., because it may not be run yet, so there is
+            # nothing worth caching.
+            LOG.warning('Unable to run %s: %s' % (executable, e))
+            return None
+
+        if self._cache is not None:
+            self._cache.store(executable, version)
+
+        return version
+
     async def _spawn_process(self, executable, loop):
-        return await loop.run_in_executor(None, self.__spawn_process, executable)
+        process = await asyncio.create_subprocess_exec(str(executable), '--version',
+                                                       stdin=subprocess.DEVNULL,
+                                                       stdout=subprocess.PIPE,
+                                                       stderr=subprocess.DEVNULL)
 
-    def __spawn_process(self, executable):
-        args = [str(executable), '--version']
+        try:
+            output = await asyncio.wait_for(self._read_output(process), self._timeout)
+        except asyncio.TimeoutError:
+            LOG.warning('%s did not display its version within %s seconds'
+                        % (executable, self._timeout))
+            return None
+        finally:
+            # on timeout or cancellation, the process is still running.
+            if process.returncode is None:
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+                await process.wait()
 
-        p = subprocess.run(args, stdout=subprocess.PIPE, universal_newlines=True)
-        match = Scanner.RE_QBS_VERSION.match(p.stdout)
+        match = Scanner.RE_QBS_VERSION.match(output.decode(errors='replace').strip())
 
         if match:
-            v = VersionNumber(match.group('version'))
-            if v >= self.minimum_version:
-                qbs = Qbs(executable, v)
+            try:
+                return VersionNumber(match.group('version'))
+            except ValueError:
+                pass
 
-        return qbs or None
+        return None
+
+    @classmethod
+    async def _read_output(cls, process):
+        output = b''
+
+        # the version number may be written in several chunks, which are each returned by read().
+        while len(output) < cls.MAX_OUTPUT_SIZE:
+            chunk = await process.stdout.read(cls.MAX_OUTPUT_SIZE - len(output))
+            if not chunk:
+                break
+            output += chunk
+
+        await process.wait()
+        return output
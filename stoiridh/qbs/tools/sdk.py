@@ -18,16 +18,34 @@
 ##                                                                                                ##
 ####################################################################################################
 import asyncio
+import configparser
+import errno
+import hashlib
+import http.client
 import logging
 import os
+import posixpath
 import shutil
 import sys
 import tarfile
 import tempfile
+import time
+import urllib.error
+import urllib.parse
 import urllib.request
+import zlib
 
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from itertools import filterfalse
 from pathlib import Path
+from .archivecache import ArchiveCache
+from .filelock import FileLock
+from .manifest import Manifest
+from .objectstore import ObjectStore
+from .sources import DirectorySource, URLSource
+from .versionconstraint import VersionConstraint
 from .versionnumber import VersionNumber
 
 
@@ -38,8 +56,39 @@ LOG = logging.getLogger(__name__)
 class SDK:
     URL = 'https://github.com/viprip/Stoiridh-Qbs-Tools/archive/{version}.tar.gz'
     ROOT_DIR = Path('StoiridhProject/StoiridhQbsTools')
+    # maximum number of packages downloaded at the same time, overall and from the same host.
+    MAX_DOWNLOADS = 4
+    MAX_DOWNLOADS_PER_HOST = 2
+    # number of times a download is retried after a network error, and delay in seconds before the
+    # first retry, which is doubled for each of the next ones.
+    DOWNLOAD_RETRIES = 3
+    DOWNLOAD_RETRY_DELAY = 1.0
+    # delay in seconds after which a download whose server does not respond is given up, so that
+    # it is retried.
+    DOWNLOAD_TIMEOUT = 30.0
+    # number of packages extracted, or moved, at the same time and maximum number of packages
+    # waiting to be extracted, or moved.
+    STAGE_WORKERS = 2
+    STAGE_QUEUE_SIZE = 2
+    # maximum number of files copied at the same time into the install location of a package, when
+    # the packages are not streamed.
+    COPY_WORKERS = 8
+    # whether the packages are extracted while they are downloaded, straight beside their install
+    # location, rather than saved into a temporary directory first.
+    STREAMING = True
+    # size limit of the cache of the downloaded archives, in bytes, or 0 to disable the cache.
+    ARCHIVE_CACHE_SIZE = ArchiveCache.MAX_SIZE
+    # whether the content of the installed files is stored once, in an object store shared by the
+    # versions, and linked into each version.
+    DEDUPLICATE = False
+    # whether a package is installed as an update of the nearest installed version, whose unchanged
+    # files are linked, or copied, rather than written again. The hard-linked files share their
+    # content with the installed version, so they must not be modified in place.
+    DELTA_UPDATES = False
+    # delay in seconds between two attempts to acquire the install lock held by another process.
+    LOCK_POLL_INTERVAL = 0.5
 
-    def __init__(self, versions, loop=None):
+    def __init__(self, versions, loop=None, constraint=None, sources=None):
         """Construct a :py:class:`SDK` object.
 
         Parameters:
@@ -49,7 +98,21 @@ class SDK:
         - *loop*, is an optional parameter that refers to an asynchronous event loop. If
           :py:obj:`None`, then the *loop* will be assigned to the current
           :py:func:`asyncio.get_event_loop()`.
+
+        - *constraint*, is an optional :py:class:`~stoiridh.qbs.tools.VersionConstraint` object, or
+          an expression, that restricts the *versions* handled by the SDK to the ones satisfying
+          it.
+
+        - *sources*, is an optional :py:obj:`list` of sources where the packages are downloaded
+          from, in priority order. A source is either a :py:class:`~stoiridh.qbs.tools.URLSource`
+          object, a :py:class:`~stoiridh.qbs.tools.DirectorySource` object, a URL template
+          containing ``{version}``, or the path of a local directory. If :py:obj:`None`, then the
+          packages are downloaded from :py:attr:`URL`.
         """
+        if constraint is not None and versions:
+            constraint = VersionConstraint.parse(constraint)
+            versions = [v for v in versions if VersionNumber(v) in constraint]
+
         self._versions = versions or None
 
         if sys.platform.startswith('linux'):
@@ -64,8 +127,23 @@ class SDK:
         else:
             self._loop = loop
 
-        self._packages = [_Package(url, self.qbs_root_path, self._loop)
-                          for url in self.__get_archive_urls()]
+        if self.ARCHIVE_CACHE_SIZE > 0:
+            self._archive_cache = ArchiveCache(self.install_root_path.joinpath('archives'),
+                                               self.ARCHIVE_CACHE_SIZE)
+        else:
+            self._archive_cache = None
+
+        if self.DEDUPLICATE:
+            self._object_store = ObjectStore(self.install_root_path.joinpath('objects'))
+        else:
+            self._object_store = None
+
+        self._lock = FileLock(self.install_root_path.joinpath('install.lock'))
+        self._sources = [self.__get_source(s) for s in sources or [self.URL]]
+        self._packages = [_Package(v, [s.url(v) for s in self._sources], self.qbs_root_path,
+                                   self._loop, self.STREAMING, self._archive_cache,
+                                   self._object_store, self.COPY_WORKERS, self.DOWNLOAD_TIMEOUT)
+                          for v in self._versions or []]
 
     @property
     def install_root_path(self):
@@ -89,6 +167,35 @@ class SDK:
         """
         return self.install_root_path.joinpath('qbs')
 
+    @property
+    def archive_cache(self):
+        """Return the :py:class:`~stoiridh.qbs.tools.ArchiveCache` object where the downloaded
+        archives are stored, or :py:obj:`None` if :py:attr:`ARCHIVE_CACHE_SIZE` is 0.
+
+        .. note::
+            The cache is located in the ``archives`` subdirectory of the
+            :py:attr:`install_root_path` directory, so it is kept by :py:meth:`clean`.
+        """
+        return self._archive_cache
+
+    @property
+    def lock(self):
+        """Return the :py:class:`~stoiridh.qbs.tools.FileLock` object held by :py:meth:`install`,
+        so that only one process of the host installs packages at the same time."""
+        return self._lock
+
+    @property
+    def object_store(self):
+        """Return the :py:class:`~stoiridh.qbs.tools.ObjectStore` object where the content of the
+        installed files is stored, or :py:obj:`None` if :py:attr:`DEDUPLICATE` is
+        :py:obj:`False`."""
+        return self._object_store
+
+    @property
+    def sources(self):
+        """Return the sources where the packages are downloaded from, in priority order."""
+        return self._sources
+
     @property
     def packages(self):
         """Return all packages available."""
@@ -97,67 +204,344 @@ class SDK:
     @property
     def noninstalled_packages(self):
         """Return a generator containing all packages that were not installed in the
-        :py:attr:`qbs_root_path` directory."""
+        :py:attr:`qbs_root_path` directory.
+
+        .. note::
+            A package is installed once its :py:class:`~stoiridh.qbs.tools.Manifest` is written,
+            after all its files.
+        """
         return filterfalse(lambda p: p.is_installed(), self.packages)
 
     def clean(self):
-        """Remove all installed packages within the :py:attr:`qbs_root_path` directory."""
-        if self.qbs_root_path.exists():
-            shutil.rmtree(str(self.qbs_root_path))
+        """Remove all installed packages within the :py:attr:`qbs_root_path` directory, along with
+        the :py:attr:`object_store`.
+
+        The packages are removed while the :py:attr:`lock` is held, so that the packages another
+        process is installing are not removed from under it.
+        """
+        with self._lock:
+            if self.qbs_root_path.exists():
+                shutil.rmtree(str(self.qbs_root_path))
+
+            objects = self.install_root_path.joinpath('objects')
+            if objects.exists():
+                shutil.rmtree(str(objects))
 
-    async def install(self):
+    async def verify(self, hash=False):
+        """Check the files of the installed packages against their manifest and return a
+        :py:obj:`dict` that maps the name of each package found in the :py:attr:`qbs_root_path`
+        directory to the :py:obj:`list` of its files that do not match, as
+        :py:meth:`~stoiridh.qbs.tools.Manifest.verify`. The list is empty when the package is
+        intact.
+
+        The sizes and the modification times of the files are checked, unless *hash* is
+        :py:obj:`True`, in which case the files are hashed.
+
+        This is a :ref:`coroutine <coroutine>` method.
+        """
+        packages = [p for p in self.packages if p.path.exists()]
+        futures = [self._loop.run_in_executor(None, p.verify, hash) for p in packages]
+        return dict(zip((p.name for p in packages), await asyncio.gather(*futures)))
+
+    async def install(self, progress=None):
         """Install the packages available that were not already installed.
 
+        Each package is downloaded, extracted and moved into the :py:attr:`qbs_root_path` directory
+        independently of the others, so that the time spent in each stage can be read from
+        :py:attr:`timings` afterwards.
+
+        An interrupted download is resumed by the next attempt, or by the next install when the
+        :py:attr:`archive_cache` is enabled.
+
+        Each package is staged in a directory beside its install location, flushed to the disk,
+        then renamed into place, so that a crash leaves either the whole package or nothing. The
+        packages are installed while the :py:attr:`lock` is held, so that several processes of the
+        host do not collide, and the staging directories left by a crashed install are removed
+        by the next one.
+
+        If *progress* is given, then it is called from the event loop each time a chunk of a package
+        is downloaded, as ``progress(package, transferred, total)``, where *transferred* is the
+        number of bytes downloaded so far and *total* is the size of the package, or :py:obj:`None`
+        if it is unknown.
+
         This is a :ref:`coroutine <coroutine>` method.
         """
-        with tempfile.TemporaryDirectory(prefix='StoiridhQbsTools') as d:
-            try:
-                packages = await self._download_packages(d)
-            except:
-                LOG.info('No packages to be installed')
+        if next(self.noninstalled_packages, None) is None:
+            LOG.info('No packages to be installed')
+            return
+
+        await self._acquire_lock()
+        try:
+            # another process may have installed the packages while the lock was awaited.
+            packages = list(self.noninstalled_packages)
+            if packages:
+                self._remove_stale_staging()
+                await self._install(packages, progress)
             else:
-                await self._move_packages(await self._extract_packages(packages))
+                LOG.info('No packages to be installed')
+        finally:
+            self._lock.release()
+
+    async def _install(self, packages, progress=None):
+        start = time.perf_counter()
+
+        order = await self._rank_sources(packages[0].version)
+        for p in packages:
+            p.urls = [self._sources[i].url(p.version) for i in order]
+
+        # the packages that are not streamed are copied from a temporary directory anyway.
+        if self.DELTA_UPDATES and self.STREAMING:
+            installed = self._installed_versions()
+            for p in packages:
+                p.base = self._nearest_version(p.version, installed)
+
+        # the stages run on their own threads, so that they can all be waited for.
+        workers = self.MAX_DOWNLOADS + 2 * max(self.STAGE_WORKERS, 1)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        for p in packages:
+            p.executor = executor
+
+        try:
+            with tempfile.TemporaryDirectory(prefix='StoiridhQbsTools') as d:
+                try:
+                    await self._run_pipeline(packages, d, progress)
+                finally:
+                    # a thread still extracting, or copying, a package must be done before the
+                    # temporary directory is removed and the lock is released.
+                    await self._shutdown(executor)
+        finally:
+            if self._archive_cache is not None:
+                await self._loop.run_in_executor(None, self._archive_cache.save)
+
+        LOG.info('%d package(s) processed in %.3fs' % (len(packages), time.perf_counter() - start))
+        for p in packages:
+            LOG.debug('%s: %s' % (p.name, ', '.join('%s %.3fs' % t for t in p.timings.items())))
+
+    @property
+    def timings(self):
+        """Return a :py:obj:`dict` that maps the name of each package to the time spent, in
+        seconds, in each stage of its installation, that is, ``'download'``, ``'extract'`` and
+        ``'install'``.
+
+        .. note::
+            A stage is missing until the package went through it. When the packages are streamed,
+            the extraction is part of the ``'download'`` stage.
+        """
+        return {p.name: dict(p.timings) for p in self.packages}
+
+    def _installed_versions(self):
+        """Return a :py:obj:`dict` that maps each version installed in the :py:attr:`qbs_root_path`
+        directory to its path."""
+        installed = dict()
+
+        if not self.qbs_root_path.exists():
+            return installed
+
+        for d in self.qbs_root_path.iterdir():
+            if d.name.startswith('.') or not d.joinpath(Manifest.FILENAME).is_file():
+                continue
+            try:
+                installed[VersionNumber(d.name)] = d
+            except ValueError:
+                LOG.debug('Ignoring %s, which is not a version of the SDK' % d)
+
+        return installed
+
+    async def _acquire_lock(self):
+        """Acquire the :py:attr:`lock`, without blocking the event loop while another process holds
+        it."""
+        if self._lock.acquire(blocking=False):
+            return
+
+        LOG.info('Waiting for another install to complete (%s)' % self._lock.path)
+        while not self._lock.acquire(blocking=False):
+            await asyncio.sleep(self.LOCK_POLL_INTERVAL)
+
+    def _remove_stale_staging(self):
+        """Remove the staging directories left by the installs that crashed, since no other install
+        is running while the lock is held."""
+        if not self.qbs_root_path.exists():
+            return
+
+        for d in self.qbs_root_path.glob('.*.staging'):
+            LOG.warning('Removing the staging directory of a crashed install: %s' % d)
+            shutil.rmtree(str(d), ignore_errors=True)
+
+    @staticmethod
+    def _nearest_version(version, installed):
+        """Return the path of the *installed* version the package of *version* is an update of,
+        that is, the latest version older than *version*, or else the oldest newer one."""
+        older = [v for v in installed if v < version]
+        newer = [v for v in installed if version < v]
 
-    async def _download_packages(self, dir):
-        """Download the non-installed packages."""
-        futures = [asyncio.ensure_future(p.download(dir)) for p in self.noninstalled_packages]
-        return await asyncio.gather(*futures)
+        if older:
+            return installed[max(older)]
+        if newer:
+            return installed[min(newer)]
+        return None
 
-    async def _extract_packages(self, packages):
-        """Extract the packages."""
-        futures = [asyncio.ensure_future(p.extract()) for p in packages if p is not None]
-        return await asyncio.gather(*futures)
+    async def _rank_sources(self, version):
+        """Return the indexes of the sources in the order they are tried: the fastest source from
+        which the package of *version* is available, then the other ones in priority order, those
+        from which the package is unavailable being the last ones."""
+        if len(self._sources) < 2:
+            return list(range(len(self._sources)))
 
-    async def _move_packages(self, packages):
-        """Move the packages."""
-        futures = [asyncio.ensure_future(p.move()) for p in packages if p is not None]
-        await asyncio.gather(*futures)
+        futures = [self._loop.run_in_executor(None, s.probe, version) for s in self._sources]
+        latencies = await asyncio.gather(*futures)
+        available = [i for i, t in enumerate(latencies) if t is not None]
+        unavailable = [i for i, t in enumerate(latencies) if t is None]
 
-    def __get_archive_url(self, version):
-        return self.URL.format(version=version)
+        if not available:
+            return unavailable
 
-    def __get_archive_urls(self):
-        return [self.__get_archive_url(v) for v in self._versions] or None
+        fastest = min(available, key=lambda i: latencies[i])
+        LOG.info('Downloading the packages from %s first' % self._sources[fastest])
+        return [fastest] + [i for i in available if i != fastest] + unavailable
+
+    async def _run_pipeline(self, packages, dir, progress=None):
+        """Download, extract and move each package independently of the others.
+
+        The stages are connected by bounded queues, so a package is extracted as soon as it is
+        downloaded and moved as soon as it is extracted, while a slow stage holds back the previous
+        ones rather than letting the packages pile up in the temporary directory.
+        """
+        scheduler = _DownloadScheduler(self.MAX_DOWNLOADS, self.MAX_DOWNLOADS_PER_HOST,
+                                       self.DOWNLOAD_RETRIES, self.DOWNLOAD_RETRY_DELAY)
+        workers = max(self.STAGE_WORKERS, 1)
+        extracting = asyncio.Queue(self.STAGE_QUEUE_SIZE)
+        installing = asyncio.Queue(self.STAGE_QUEUE_SIZE)
+
+        downloaders = [asyncio.ensure_future(self._download_stage(p, scheduler, dir, extracting,
+                                                                  progress))
+                       for p in packages]
+        extract = partial(self._extract, scheduler=scheduler, dir=dir, progress=progress)
+        extractors = [asyncio.ensure_future(self._stage(extract, extracting, installing))
+                      for _ in range(workers)]
+        installers = [asyncio.ensure_future(self._stage(_Package.move, installing))
+                      for _ in range(workers)]
+        tasks = downloaders + extractors + installers
+        tasks.append(asyncio.ensure_future(self._close_stage(downloaders, extracting, workers)))
+        tasks.append(asyncio.ensure_future(self._close_stage(extractors, installing, workers)))
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # a failing stage must not leave the other ones waiting for it.
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _shutdown(self, executor):
+        """Shut the *executor* down once its threads are done, without blocking the event loop,
+        unless the install is cancelled meanwhile."""
+        try:
+            await self._loop.run_in_executor(None, executor.shutdown, True)
+        except asyncio.CancelledError:
+            executor.shutdown(wait=True)
+            raise
+
+    async def _download_stage(self, package, scheduler, dir, queue, progress=None):
+        """Download the package, then pass it on to the next stage."""
+        if await scheduler.download(package, dir, progress) is not None:
+            await queue.put(package)
+
+    async def _extract(self, package, scheduler, dir, progress=None):
+        """Extract the package, or download it from its next sources as long as their archive
+        cannot be extracted, and return it, or :py:obj:`None` if none of them succeeds."""
+        while True:
+            try:
+                return await package.extract()
+            except _Package.ARCHIVE_ERRORS as e:
+                LOG.warning('Unable to extract the following package: (url: %s, reason: %s)'
+                            % (package.url, e))
+
+            urls = package.urls[package.urls.index(package.url) + 1:]
+            if await scheduler.download(package, dir, progress, urls) is None:
+                return None
+
+    async def _stage(self, func, queue, next_queue=None):
+        """Apply the coroutine function *func* to the packages taken from *queue*, until
+        :py:obj:`None` is taken, and pass them on to *next_queue*."""
+        while True:
+            package = await queue.get()
+            if package is None:
+                return
+            package = await func(package)
+            if package is not None and next_queue is not None:
+                await next_queue.put(package)
+
+    async def _close_stage(self, tasks, queue, workers):
+        """Tell the *workers* of the next stage that no more packages will be put into *queue*, once
+        the *tasks* of the current stage are done."""
+        await asyncio.gather(*tasks)
+        for _ in range(workers):
+            await queue.put(None)
+
+    @staticmethod
+    def __get_source(source):
+        if isinstance(source, URLSource):
+            return source
+        if isinstance(source, str) and '{version}' in source:
+            return URLSource(source)
+        return DirectorySource(source)
 
     def __repr__(self):
         return ('<%s versions=%s>' % (self.__class__.__name__, self._versions))
 
 
 class _Package:
-    def __init__(self, url, path, loop):
+    # size of the chunks copied from the HTTP response to the file.
+    CHUNK_SIZE = 64 * 1024
+    # errors raised while a corrupt, or truncated, archive is extracted.
+    ARCHIVE_ERRORS = (tarfile.TarError, EOFError, zlib.error)
+
+    def __init__(self, version, urls, path, loop, streaming=False, cache=None, store=None,
+                 copy_workers=None, timeout=None):
         assert isinstance(path, Path)
         assert isinstance(loop, asyncio.BaseEventLoop)
 
+        if isinstance(urls, str):
+            urls = [urls]
+
         self._loop = loop
         self._path = path
-        self._url = url
+        self._urls = list(urls)
+        self._url = self._urls[0]
+        # the name does not depend on the URLs, whose templates may name the archives differently.
+        self._name = str(version)
+        self._version = VersionNumber(self._name)
+        self._streaming = streaming
+        self._archive_cache = cache
+        self._object_store = store
+        self._copy_workers = copy_workers
+        self._timeout = timeout
+        self._executor = None
+        self._base = None
+        self._manifest = None
         self._temp_package = None
+        self._timings = dict()
 
     @property
     def url(self):
-        """Return the URL of the package."""
+        """Return the URL the package is downloaded from."""
         return self._url
 
+    @url.setter
+    def url(self, value):
+        assert value in self._urls
+        self._url = value
+
+    @property
+    def urls(self):
+        """Return the URLs of the package, one for each source, in the order they are tried."""
+        return self._urls
+
+    @urls.setter
+    def urls(self, value):
+        self._urls = list(value)
+        self._url = self._urls[0]
+
     @property
     def filename(self):
         """Return the filename of the package."""
@@ -166,19 +550,39 @@ class _Package:
     @property
     def name(self):
         """Return the name of the package."""
-        # remove the '.tar.gz' file extension
-        return self.filename[:-7]
+        return self._name
 
     @property
     def version(self):
         """Return the version of the package."""
-        return VersionNumber(self.name)
+        return self._version
 
     @property
     def path(self):
         """Return the path where the package is installed."""
         return self._path.joinpath(str(self.version))
 
+    @property
+    def executor(self):
+        """Return the executor where the stages of the package are run, or :py:obj:`None` for the
+        default executor of the loop."""
+        return self._executor
+
+    @executor.setter
+    def executor(self, value):
+        self._executor = value
+
+    @property
+    def base(self):
+        """Return the path of the installed version the package is an update of, or
+        :py:obj:`None`."""
+        return self._base
+
+    @base.setter
+    def base(self, value):
+        assert value is None or isinstance(value, Path)
+        self._base = value
+
     @property
     def temp(self):
         """Return the temporary package.
@@ -197,45 +601,216 @@ class _Package:
     def temp(self):
         del self._temp_package
 
+    @property
+    def timings(self):
+        """Return a :py:obj:`dict` that maps each stage the package went through to the time spent
+        in it, in seconds."""
+        return self._timings
+
+    @property
+    def manifest_path(self):
+        """Return the filepath of the manifest of the installed package."""
+        return self.path.joinpath(Manifest.FILENAME)
+
+    @property
+    def staging_path(self):
+        """Return the directory where the package is staged before it is renamed into
+        :py:attr:`path`. The directory is beside :py:attr:`path`, so that the rename is atomic."""
+        return self._path.joinpath('.%s.staging' % self.version)
+
     def is_installed(self):
-        """Check whether the package is installed."""
-        return self.path.exists() if self.path else False
+        """Check whether the package is installed, that is, whether its manifest was written once
+        all its files were installed."""
+        return self.manifest_path.exists() if self.path else False
+
+    def verify(self, hash=False):
+        """Check the installed files of the package against its manifest and return the files that
+        do not match, as :py:meth:`Manifest.verify`. An installed package without any manifest is
+        reported as a missing manifest."""
+        try:
+            manifest = Manifest.read(self.manifest_path)
+        except (OSError, ValueError) as e:
+            LOG.debug('Unable to read the manifest of %s: %s' % (self.version, e))
+            return [(Manifest.FILENAME, Manifest.MISSING)]
 
-    async def download(self, dir):
+        return manifest.verify(self.path, hash)
+
+    async def download(self, dir, progress=None):
         """Download the package."""
-        return await self._loop.run_in_executor(None, self._download, dir)
+        with self._timed('download'):
+            return await self._loop.run_in_executor(self._executor, self._download, dir, progress)
 
     async def extract(self):
         """Extract the package."""
-        return await self._loop.run_in_executor(None, self._extract)
+        if self._streaming:
+            # the package was extracted while it was downloaded.
+            return self
+
+        with self._timed('extract'):
+            return await self._loop.run_in_executor(self._executor, self._extract)
 
     async def move(self):
         """Move the extracted content of the temporary package into `path`."""
-        return await self._loop.run_in_executor(None, self._move)
+        with self._timed('install'):
+            return await self._loop.run_in_executor(self._executor, self._move)
+
+    @contextmanager
+    def _timed(self, stage):
+        """Add the time spent within the context to the timing of *stage*, so that the retries of a
+        stage are accounted for."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._timings[stage] = self._timings.get(stage, 0.0) + elapsed
+
+    @property
+    def _cache(self):
+        # there is no point to cache a local file.
+        if urllib.parse.urlsplit(self.url).scheme == 'file':
+            return None
+        return self._archive_cache
+
+    def _download(self, dir, progress=None):
+        archive = self._cache.lookup(self.url) if self._cache is not None else None
+
+        if archive is not None:
+            LOG.info('Using the cached archive of %s' % self.url)
+            if self._streaming:
+                try:
+                    with archive.open(mode='rb') as f:
+                        self._extract_stream(_Transfer(self, f))
+                except self.ARCHIVE_ERRORS:
+                    self._cache.remove(self.url)
+                    raise
+            else:
+                self.temp = _TemporaryPackage(archive)
+                self.temp.path = Path(dir, self.name)
+            return self
 
-    def _download(self, dir):
         LOG.info('Downloading %s ...' % self.url)
         try:
-            filepath = Path(dir, self.filename)
-            self.temp = _TemporaryPackage(filepath)
-            with urllib.request.urlopen(self.url) as b, filepath.open(mode='wb') as f:
-                f.write(b.read())
-        except urllib.request.HTTPError as e:
+            if self._streaming and self._cache is None:
+                # nothing is written to the disk, except the extracted files.
+                with urllib.request.urlopen(self.url, timeout=self._timeout) as b:
+                    total = _Transfer.content_length(b)
+                    self._extract_stream(_Transfer(self, b, total, progress))
+            else:
+                self._download_partial(dir, progress)
+        except urllib.error.HTTPError as e:
+            # a server error may be temporary, so the download may be retried.
+            if e.code >= 500:
+                raise
             LOG.warning('Unable to download the following package: (url: %s, code: %s, reason: %s)'
                         % (self.url, e.code, e.reason))
         else:
             return self
 
+    def _download_partial(self, dir, progress=None):
+        """Download the archive into a partial file, which is resumed if it is left by a previous
+        attempt, then check it. When the package is streamed, it is extracted at the same time,
+        starting with the part downloaded by the previous attempt."""
+        if self._cache is not None:
+            # the partial file must outlive the temporary directory in order to be resumed.
+            partdir = self._cache.path.joinpath('partial')
+        else:
+            partdir = Path(dir)
+        digest = hashlib.sha256(self.url.encode('utf-8')).hexdigest()[:16]
+        part = _PartialDownload(partdir.joinpath('%s-%s.part' % (self.name, digest)), self.url,
+                                self._timeout)
+
+        with part.request() as response, part.filepath.open(mode='ab') as f:
+            transfer = _Transfer(self, response, part.length, progress, sink=f,
+                                 transferred=part.offset)
+            if self._streaming:
+                with part.filepath.open(mode='rb') as resumed:
+                    try:
+                        self._extract_stream(_Chain(resumed, part.offset, transfer))
+                    except self.ARCHIVE_ERRORS:
+                        # a corrupt archive must not be resumed by the next attempt.
+                        part.discard()
+                        raise
+            else:
+                while transfer.read(self.CHUNK_SIZE):
+                    pass
+
+        try:
+            filepath = part.complete()
+        except:
+            if self._streaming:
+                shutil.rmtree(str(self.temp.path), ignore_errors=True)
+            raise
+
+        if self._cache is not None:
+            filepath = self._cache.store(self.url, filepath)
+        elif not self._streaming:
+            os.replace(str(filepath), str(Path(dir, '%s.tar.gz' % self.name)))
+            filepath = Path(dir, '%s.tar.gz' % self.name)
+
+        if not self._streaming:
+            self.temp = _TemporaryPackage(filepath)
+            self.temp.path = Path(dir, self.name)
+
+    def _extract_stream(self, transfer):
+        """Extract the files of the ``<root>/share`` directory of the archive read from *transfer*
+        into a staging directory beside :py:attr:`path`, in a single pass over the gzip stream."""
+        staging = self.staging_path
+
+        # remove what is left by a previous attempt.
+        if staging.exists():
+            shutil.rmtree(str(staging))
+        staging.mkdir(parents=True)
+
+        self.temp = _TemporaryPackage(staging)
+        self.temp.path = staging
+        base, manifest = self._read_base()
+
+        try:
+            with tarfile.open(fileobj=transfer, mode='r|gz', bufsize=self.CHUNK_SIZE) as tar:
+                extractor = _Extractor(tar, staging, base, manifest)
+                extractor.extract()
+            # the end of the stream is not needed by tarfile, but it is still part of the package.
+            while transfer.read(self.CHUNK_SIZE):
+                pass
+        except:
+            shutil.rmtree(str(staging), ignore_errors=True)
+            raise
+
+        if base is not None:
+            LOG.info('%d file(s) of %s reused from %s'
+                     % (extractor.reused, self.version, base.name))
+        self._manifest = extractor.manifest
+
+    def _read_base(self):
+        """Return the path and the manifest of the installed version the package is an update of,
+        or ``(None, None)`` if the package is installed from scratch."""
+        if self._base is None:
+            return None, None
+
+        try:
+            return self._base, Manifest.read(self._base.joinpath(Manifest.FILENAME))
+        except (OSError, ValueError) as e:
+            LOG.warning('Unable to update %s from %s: %s' % (self.version, self._base.name, e))
+            return None, None
+
     def _extract(self):
         filepath = self.temp.filepath
 
         if filepath.exists():
-            with tarfile.open(str(filepath), mode='r:gz') as tar:
-                rootdir = '%s/share' % tar.getnames()[0]
-                self.temp.path = Path(filepath.parent, rootdir)
-                for info in tar:
-                    if info.isfile() and info.name.startswith(rootdir):
-                        tar.extract(info.name, path=str(filepath.parent))
+            # each package is extracted into its own directory, since several packages may be
+            # extracted at the same time.
+            dir = self.temp.path
+            dir.mkdir()
+            try:
+                with tarfile.open(str(filepath), mode='r:gz') as tar:
+                    _Extractor(tar, dir).extract()
+            except self.ARCHIVE_ERRORS:
+                shutil.rmtree(str(dir), ignore_errors=True)
+                # the archive was stored into the cache before it could be extracted.
+                if self._cache is not None:
+                    self._cache.remove(self.url)
+                raise
         else:
             LOG.warning("Unable to extract the package (%s), because it doesn't exists" % self.name)
 
@@ -243,21 +818,493 @@ class _Package:
 
     def _move(self):
         LOG.info('Installing %s' % self.version)
+        if self._streaming:
+            return self._commit(self.temp.path)
+
+        # the package is copied beside its install location, then committed as a streamed one.
+        staging = self.staging_path
+        if staging.exists():
+            shutil.rmtree(str(staging))
+
+        try:
+            start = time.perf_counter()
+            files, size = _CopyEngine(self._copy_workers).copy(self.temp.path, staging)
+            elapsed = max(time.perf_counter() - start, 1e-9)
+        except (shutil.Error, OSError) as e:
+            LOG.error(e)
+            shutil.rmtree(str(staging), ignore_errors=True)
+        else:
+            LOG.info('%d file(s) of %s copied in %.3fs (%.0f files/s, %.1f MB/s)'
+                     % (files, self.version, elapsed, files / elapsed, size / elapsed / 1e6))
+            self._commit(staging)
+
+    def _commit(self, staging):
+        """Write the manifest of the *staging* directory, flush it to the disk, then rename it into
+        :py:attr:`path`, so that a crash leaves either the whole package or no package at all."""
+        self._remove_incomplete()
+
         try:
-            for d in self.temp.path.iterdir():
-                shutil.copytree(str(d), str(self.path.joinpath(d.parts[-1])))
-        except shutil.Error as e:
+            # the files of an update were hashed while they were extracted.
+            manifest = self._manifest or Manifest.build(staging)
+            if self._object_store is not None:
+                manifest = self._object_store.deduplicate(staging, manifest)
+            manifest.write(staging.joinpath(Manifest.FILENAME))
+            self._fsync_tree(staging)
+            staging.rename(self.path)
+            self._fsync(self._path)
+        except OSError as e:
             LOG.error(e)
+            shutil.rmtree(str(staging), ignore_errors=True)
         else:
             LOG.info('The package %s was successfully installed' % self.version)
             del self.temp
 
+    @classmethod
+    def _fsync_tree(cls, path):
+        """Flush the files of the *path* directory, and the directories themselves, to the disk."""
+        for root, dirs, files in os.walk(str(path)):
+            for name in files:
+                cls._fsync(Path(root, name))
+            cls._fsync(Path(root))
+
+    @staticmethod
+    def _fsync(path):
+        flags = os.O_RDONLY
+
+        if sys.platform.startswith('win32'):
+            # the directories cannot be opened under Windows, where their entries are flushed
+            # anyway, and os.fsync needs a write access, which a read-only file cannot be opened
+            # with.
+            if path.is_dir() or not os.access(str(path), os.W_OK):
+                return
+            flags = os.O_RDWR
+
+        fd = os.open(str(path), flags)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _remove_incomplete(self):
+        """Remove what is left by a previous install that did not complete."""
+        if self.path.exists():
+            LOG.warning('Removing the incomplete install of %s' % self.version)
+            shutil.rmtree(str(self.path))
+
     def __repr__(self):
         return ('<%s url=%s filename=%r name=%r version=%r is_installed=%s path=%s>'
                 % (self.__class__.__name__, self.url, self.filename, self.name, self.version,
                    self.is_installed(), self.path if self.is_installed() else None))
 
 
+class _Extractor:
+    def __init__(self, tar, path, base=None, manifest=None):
+        """Extract the files of the ``<root>/share`` directory of the *tar* archive into *path*,
+        where ``<root>`` is the top directory of the first member of the archive.
+
+        The archive is read in a single sequential pass, so it may be opened in stream mode.
+
+        If the *base* directory of an installed version is given, along with its *manifest*, then
+        the files whose content did not change since that version are linked, or copied, from
+        *base* rather than written, and the files are hashed as they are extracted."""
+        self._tar = tar
+        self._path = path
+        self._base = base
+        self._base_manifest = manifest
+        self._entries = dict()
+        self._reused = 0
+
+    @property
+    def manifest(self):
+        """Return the manifest of the files extracted as an update of *base*, or :py:obj:`None`."""
+        return Manifest(self._entries) if self._base is not None else None
+
+    @property
+    def reused(self):
+        """Return the number of files linked, or copied, from *base*."""
+        return self._reused
+
+    def extract(self):
+        """Extract the files and return their number."""
+        prefix = None
+        count = 0
+
+        for info in self._tar:
+            if prefix is None:
+                prefix = '%s/share/' % info.name.split('/')[0]
+            if not info.isfile() or not info.name.startswith(prefix):
+                continue
+
+            name = self.safe_name(info.name[len(prefix):])
+            if name is None:
+                LOG.warning('Skipping a member outside of the package: %s' % info.name)
+                continue
+
+            info.name = name
+            if self._base is None:
+                self._tar.extract(info, path=str(self._path))
+            else:
+                self._update(info)
+            count += 1
+
+        return count
+
+    def _update(self, info):
+        """Extract the member *info*, unless the file of *base* has the same content."""
+        filepath = self._path.joinpath(info.name)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+
+        # the files of the SDK are small enough to be hashed in memory.
+        data = self._tar.extractfile(info).read()
+        digest = hashlib.sha256(data).hexdigest()
+        entry = self._base_manifest.entries.get(info.name)
+
+        if entry is not None and entry[2] == digest and self._reuse(info.name, entry, filepath):
+            self._reused += 1
+        else:
+            filepath.write_bytes(data)
+            os.chmod(str(filepath), info.mode & 0o777)
+            os.utime(str(filepath), (info.mtime, info.mtime))
+
+        st = os.stat(str(filepath))
+        self._entries[info.name] = (st.st_size, st.st_mtime_ns, digest)
+
+    def _reuse(self, name, entry, filepath):
+        """Link, or copy, the file *name* of *base* into *filepath*, unless it was modified since
+        *base* was installed, in which case :py:obj:`False` is returned."""
+        source = self._base.joinpath(name)
+
+        try:
+            st = os.stat(str(source))
+        except OSError:
+            return False
+        if (st.st_size, st.st_mtime_ns) != entry[:2]:
+            LOG.debug('%s was modified since it was installed' % source)
+            return False
+
+        try:
+            os.link(str(source), str(filepath))
+        except OSError:
+            shutil.copy2(str(source), str(filepath))
+        return True
+
+    @staticmethod
+    def safe_name(name):
+        """Return the normalised *name* of a member, or :py:obj:`None` if the member would be
+        extracted outside of the destination directory, i.e., if its name is absolute, has a drive
+        or goes up with ``..``."""
+        name = posixpath.normpath(name.replace('\\', '/'))
+
+        if name.startswith('/') or name == '..' or name.startswith('../') or name == '.':
+            return None
+        if ':' in name.split('/')[0]:
+            return None
+
+        return name
+
+
+class _CopyEngine:
+    # whether the kernel may copy the files by itself, until it fails to.
+    _copy_file_range = hasattr(os, 'copy_file_range')
+
+    def __init__(self, workers=None):
+        """Copy a directory tree through a pool of up to *workers* threads, so that the latency of
+        each file, e.g., on a networked home directory, is spent concurrently."""
+        self._workers = workers
+
+    def copy(self, src, dst):
+        """Copy the content of the *src* directory into the *dst* directory, which is created, as
+        :py:func:`shutil.copytree`, and return the number of files and bytes copied."""
+        src = Path(src)
+        dst = Path(dst)
+        dirs = []
+        files = []
+
+        # the tree is listed once, and the directories are created before the files are copied.
+        for root, _, names in os.walk(str(src)):
+            relpath = Path(root).relative_to(src)
+            dst.joinpath(relpath).mkdir(parents=True)
+            dirs.append(relpath)
+            files.extend(relpath.joinpath(n) for n in names)
+
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            sizes = list(executor.map(lambda n: self._copy_file(src.joinpath(n), dst.joinpath(n)),
+                                      files))
+
+        # the files copied into a directory change its modification time.
+        for relpath in reversed(dirs):
+            shutil.copystat(str(src.joinpath(relpath)), str(dst.joinpath(relpath)))
+
+        return len(files), sum(sizes)
+
+    @classmethod
+    def _copy_file(cls, src, dst):
+        """Copy the file *src* into *dst*, as :py:func:`shutil.copy2`, and return its size."""
+        if not cls._copy_file_range or not cls._copy_range(src, dst):
+            # shutil.copyfile uses os.sendfile, where the kernel offers it.
+            shutil.copyfile(str(src), str(dst))
+        shutil.copystat(str(src), str(dst))
+        return os.stat(str(dst)).st_size
+
+    @classmethod
+    def _copy_range(cls, src, dst):
+        """Copy the file *src* into *dst* within the kernel, with :py:func:`os.copy_file_range`,
+        and return :py:obj:`True`, or return :py:obj:`False` if the filesystems do not support
+        it."""
+        with src.open(mode='rb') as s, dst.open(mode='wb') as d:
+            size = os.fstat(s.fileno()).st_size
+            copied = 0
+
+            while copied < size:
+                try:
+                    n = os.copy_file_range(s.fileno(), d.fileno(), size - copied)
+                except OSError as e:
+                    if copied or e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL,
+                                                 errno.EOPNOTSUPP, errno.EPERM):
+                        raise
+                    # a copy across filesystems may be the only one unsupported.
+                    cls._copy_file_range = e.errno == errno.EXDEV
+                    return False
+                if n == 0:
+                    # some filesystems report nothing copied rather than an error.
+                    if not copied:
+                        return False
+                    raise OSError(errno.EIO, 'Unable to copy %s: only %d of %d bytes were copied'
+                                  % (src, copied, size))
+                copied += n
+
+        return True
+
+
+class _Transfer:
+    def __init__(self, package, response, total=None, progress=None, sink=None, transferred=0):
+        """File-like object that reads the *response* of the download of the *package*, of *total*
+        bytes, and calls *progress*, from the event loop, each time a chunk is read. If *sink* is
+        given, then the chunks are also written into it. *transferred* is the number of bytes
+        downloaded by a previous attempt, when the download is resumed."""
+        self._package = package
+        self._response = response
+        self._progress = progress
+        self._sink = sink
+        self.total = total
+        self.transferred = transferred
+
+    @staticmethod
+    def content_length(response):
+        """Return the size of the *response*, or :py:obj:`None` if it is unknown."""
+        length = response.headers.get('Content-Length')
+        return int(length) if length and length.isdigit() else None
+
+    def read(self, size=-1):
+        """Read at most *size* bytes.
+
+        :raise: :py:exc:`urllib.error.ContentTooShortError` when the response ends before *total*
+                bytes are read, since :py:mod:`http.client` does not report a connection dropped
+                during the transfer.
+        """
+        chunk = self._response.read(size)
+
+        if not chunk and size != 0 and self.total is not None and self.transferred < self.total:
+            raise urllib.error.ContentTooShortError('%s: %d out of %d bytes downloaded'
+                                                    % (self._package.url, self.transferred,
+                                                       self.total), None)
+
+        if chunk:
+            if self._sink is not None:
+                self._sink.write(chunk)
+            self.transferred += len(chunk)
+            LOG.debug('%s: %d/%s bytes downloaded'
+                      % (self._package.name, self.transferred, self.total or '?'))
+            if self._progress is not None:
+                self._package._loop.call_soon_threadsafe(self._progress, self._package,
+                                                         self.transferred, self.total)
+
+        return chunk
+
+
+class _Chain:
+    def __init__(self, first, size, second):
+        """File-like object that reads the *size* first bytes of *first*, then *second*."""
+        self._first = first
+        self._size = size
+        self._second = second
+
+    def read(self, size=-1):
+        if self._size > 0:
+            chunk = self._first.read(self._size if size < 0 else min(size, self._size))
+            self._size -= len(chunk)
+            if chunk:
+                return chunk
+            self._size = 0
+        return self._second.read(size)
+
+
+class _PartialDownload:
+    def __init__(self, filepath, url, timeout=None):
+        """Archive downloaded from *url* into the partial file *filepath*. The expected length of
+        the archive and its validator, i.e., its ETag or its modification date, are stored beside,
+        into ``<filepath>.info``, so that an interrupted download is resumed with a ``Range``
+        request. The server is given up after *timeout* seconds without a response."""
+        self.filepath = filepath
+        self.url = url
+        self.timeout = timeout
+        self.offset = 0
+        self.length = None
+        self._infopath = filepath.with_name(filepath.name + '.info')
+
+    def request(self):
+        """Send the request of the archive, from the end of the partial file if the download can
+        be resumed, and return the response. The partial file is truncated when the download
+        starts over."""
+        self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        length, validator = self._load()
+        offset = self.filepath.stat().st_size if validator and self.filepath.exists() else 0
+        request = urllib.request.Request(self.url)
+
+        if 0 < offset < (length or float('inf')):
+            request.add_header('Range', 'bytes=%d-' % offset)
+            request.add_header('If-Range', validator)
+        else:
+            offset = 0
+
+        response = urllib.request.urlopen(request, timeout=self.timeout)
+
+        try:
+            if offset and response.status == 206 and self._is_resumed(response, offset, length):
+                LOG.info('Resuming the download of %s at %d bytes' % (self.url, offset))
+            else:
+                offset = 0
+                length = _Transfer.content_length(response)
+                self.filepath.open(mode='wb').close()
+
+            self.offset = offset
+            self.length = length
+            self._save(response)
+        except:
+            response.close()
+            raise
+
+        return response
+
+    def complete(self):
+        """Check that the partial file is complete and return its filepath, once the information
+        about the download is removed.
+
+        :raise: :py:exc:`urllib.error.ContentTooShortError` when the partial file is incomplete.
+        """
+        size = self.filepath.stat().st_size
+
+        if self.length is not None and size != self.length:
+            raise urllib.error.ContentTooShortError('%s: %d out of %d bytes downloaded'
+                                                    % (self.url, size, self.length), None)
+
+        try:
+            self._infopath.unlink()
+        except FileNotFoundError:
+            pass
+
+        return self.filepath
+
+    def discard(self):
+        """Remove the partial file, along with the information about the download."""
+        for filepath in (self.filepath, self._infopath):
+            try:
+                filepath.unlink()
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _is_resumed(response, offset, length):
+        content_range = response.headers.get('Content-Range', '')
+        return content_range.startswith('bytes %d-' % offset) and \
+            content_range.endswith('/%s' % length)
+
+    def _load(self):
+        config = configparser.ConfigParser(interpolation=None)
+
+        try:
+            with self._infopath.open(mode='r', encoding='utf-8') as f:
+                config.read_file(f)
+            section = config['download']
+            if section['url'] != self.url:
+                return None, None
+            return int(section['length']), section['validator']
+        except (OSError, configparser.Error, KeyError, ValueError):
+            return None, None
+
+    def _save(self, response):
+        validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+        config = configparser.ConfigParser(interpolation=None)
+
+        if validator is None or self.length is None:
+            # the download cannot be resumed safely.
+            try:
+                self._infopath.unlink()
+            except FileNotFoundError:
+                pass
+            return
+
+        config['download'] = {'url': self.url, 'length': str(self.length),
+                              'validator': validator}
+        with self._infopath.open(mode='w', encoding='utf-8') as f:
+            config.write(f)
+
+
+class _DownloadScheduler:
+    def __init__(self, limit, host_limit, retries, delay):
+        """Schedule the downloads of the packages, with at most *limit* downloads at the same time
+        and at most *host_limit* ones from the same host. A download that fails because of a network
+        error is retried up to *retries* times, after a delay of *delay* seconds doubled at each
+        attempt."""
+        self._semaphore = asyncio.Semaphore(max(limit, 1))
+        self._host_limit = max(host_limit, 1)
+        self._host_semaphores = dict()
+        self._retries = retries
+        self._delay = delay
+
+    async def download(self, package, dir, progress=None, urls=None):
+        """Download the *package* into *dir*, from the first of its URLs that succeeds, and return
+        it, or :py:obj:`None` if the download failed from all of them. If *urls* is given, then
+        the package is only downloaded from those."""
+        for url in package.urls if urls is None else urls:
+            package.url = url
+            if await self._download(package, dir, progress) is not None:
+                return package
+
+        return None
+
+    async def _download(self, package, dir, progress=None):
+        url = urllib.parse.urlsplit(package.url)
+        # there is no point to retry to read a local file.
+        retries = self._retries if url.scheme in ('http', 'https', 'ftp') else 0
+
+        if url.netloc not in self._host_semaphores:
+            self._host_semaphores[url.netloc] = asyncio.Semaphore(self._host_limit)
+
+        for attempt in range(retries + 1):
+            try:
+                # the host is awaited first, so that a download queued behind a busy host does
+                # not hold a slot the other hosts could use.
+                async with self._host_semaphores[url.netloc], self._semaphore:
+                    return await package.download(dir, progress)
+            except _Package.ARCHIVE_ERRORS as e:
+                # downloading the same archive again is pointless, unlike the next source.
+                LOG.warning('Unable to extract the following package: (url: %s, reason: %s)'
+                            % (package.url, e))
+                return None
+            except (OSError, http.client.HTTPException) as e:
+                # urllib.error.URLError and socket errors, socket.timeout included, are all
+                # OSError, and a connection dropped during the transfer raises
+                # http.client.IncompleteRead.
+                if attempt == retries:
+                    LOG.warning('Unable to download the following package: (url: %s, reason: %s)'
+                                % (package.url, e))
+                    return None
+                delay = self._delay * 2 ** attempt
+                LOG.info('Retrying to download %s in %.1f seconds (%s)' % (package.url, delay, e))
+                await asyncio.sleep(delay)
+
+
 class _TemporaryPackage:
     def __init__(self, filepath):
         assert isinstance(filepath, Path)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+import time
+import urllib.parse
+import urllib.request
+
+from pathlib import Path
+
+
+class URLSource:
+    # maximum time, in seconds, to wait for a remote source when it is probed.
+    PROBE_TIMEOUT = 5.0
+
+    def __init__(self, template):
+        """Construct a :py:class:`URLSource` object.
+
+        The source provides the packages of the :py:class:`~stoiridh.qbs.tools.SDK` from the URLs
+        built from *template*, where ``{version}`` is replaced by the version of a package, e.g.,
+        ``https://mirror.example.org/sqt/{version}.tar.gz`` or
+        ``file:///srv/mirror/sqt/{version}.tar.gz``.
+
+        :raise: :py:exc:`ValueError` when *template* does not contain ``{version}``.
+        """
+        if '{version}' not in template:
+            raise ValueError("argument (template) should contain '{version}', not %r" % template)
+
+        self._template = template
+
+    @property
+    def template(self):
+        """This read-only property returns the URL template of the source."""
+        return self._template
+
+    def url(self, version):
+        """Return the URL of the package of *version*."""
+        return self._template.format(version=version)
+
+    def probe(self, version):
+        """Return the time, in seconds, spent to check that the package of *version* is available
+        from the source, or :py:obj:`None` if it is not.
+
+        .. note::
+            A remote source is checked with a ``HEAD`` request, which is given up after
+            :py:attr:`PROBE_TIMEOUT` seconds.
+        """
+        url = self.url(version)
+        start = time.perf_counter()
+
+        if urllib.parse.urlsplit(url).scheme == 'file':
+            path = urllib.request.url2pathname(urllib.parse.urlsplit(url).path)
+            return time.perf_counter() - start if Path(path).is_file() else None
+
+        try:
+            request = urllib.request.Request(url, method='HEAD')
+            with urllib.request.urlopen(request, timeout=self.PROBE_TIMEOUT):
+                pass
+        except (OSError, ValueError):
+            return None
+
+        return time.perf_counter() - start
+
+    def __eq__(self, other):
+        if not isinstance(other, URLSource):
+            return NotImplemented
+        return self._template == other._template
+
+    def __hash__(self):
+        return hash(self._template)
+
+    def __repr__(self):
+        return '<%s template=%s>' % (self.__class__.__name__, self._template)
+
+
+class DirectorySource(URLSource):
+    def __init__(self, path):
+        """Construct a :py:class:`DirectorySource` object.
+
+        The source provides the packages of the :py:class:`~stoiridh.qbs.tools.SDK` from the local
+        directory *path*, where the package of a version is named ``<version>.tar.gz``, as in the
+        releases of the project.
+
+        :raise: :py:exc:`TypeError` when *path* is not a :py:class:`str` object or a
+                :py:class:`pathlib.Path` object.
+        """
+        if isinstance(path, str):
+            path = Path(path)
+        elif not isinstance(path, Path):
+            raise TypeError("argument (path) should be a str or pathlib.Path object, not %r"
+                            % type(path))
+
+        self._path = path.resolve()
+        super().__init__(self._path.as_uri() + '/{version}.tar.gz')
+
+    @property
+    def path(self):
+        """This read-only property returns the directory of the source.
+
+        :rtype: pathlib.Path
+        """
+        return self._path
+
+    def __repr__(self):
+        return '<%s path=%s>' % (self.__class__.__name__, self._path)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+import re
+
+from .versionnumber import VersionNumber
+
+
+class VersionConstraint:
+    re_clause = re.compile(r'^(?P<operator>>=|<=|==|!=|>|<)?\s*(?P<version>\S+)$')
+
+    # upper bound of a constraint without any upper limit, greater than any segments.
+    _INFINITY = (float('inf'),)
+
+    def __init__(self, expression):
+        """Construct a :py:class:`VersionConstraint` object.
+
+        *expression* is a comma-separated list of clauses that must all be satisfied by a version
+        number. A clause is made of an operator, either ``>=``, ``>``, ``<=``, ``<``, ``==``, or
+        ``!=``, followed by a version number. A version number without any operator is equivalent
+        to the ``==`` operator.
+
+        The expression is parsed once and compiled into a matcher, so that checking a version
+        number against the constraint only costs a couple of tuple comparisons.
+
+        Example::
+
+            >>> c = VersionConstraint('>=1.5, <2.0, !=1.6.1')
+            >>> VersionNumber('1.6.0') in c
+            True
+            >>> c.filter([VersionNumber('1.4.0'), VersionNumber('1.6.1'), VersionNumber('1.7.2')])
+            [<VersionNumber major=1 minor=7 patch=2>]
+
+        :raise: :py:exc:`TypeError` if *expression* is not a :py:obj:`str` object.
+        :raise: :py:exc:`ValueError` if *expression* is not a valid constraint.
+        """
+        if not isinstance(expression, str):
+            raise TypeError('argument (expression) should be a str object, not %r'
+                            % type(expression))
+
+        clauses = [clause.strip() for clause in expression.split(',')]
+
+        # the lower bound is inclusive and the upper bound is exclusive.
+        lower = ()
+        upper = self._INFINITY
+        excluded = set()
+
+        for clause in clauses:
+            m = VersionConstraint.re_clause.match(clause)
+            if not m:
+                raise ValueError('The version constraint is not valid:', expression)
+
+            operator = m.group('operator') or '=='
+            segments = VersionNumber(m.group('version'))._segments
+            # since the segments are integers, the next segments are the smallest ones which are
+            # greater than *segments*.
+            following = segments[:2] + (segments[2] + 1,)
+
+            if operator in ('>=', '>', '=='):
+                lower = max(lower, segments if operator != '>' else following)
+            if operator in ('<=', '<', '=='):
+                upper = min(upper, segments if operator == '<' else following)
+            if operator == '!=':
+                excluded.add(segments)
+
+        self._expression = ', '.join(clauses)
+        self._lower = lower
+        self._upper = upper
+        self._excluded = frozenset(excluded)
+
+        if excluded:
+            self._match = lambda s: lower <= s < upper and s not in excluded
+        else:
+            self._match = lambda s: lower <= s < upper
+
+    @classmethod
+    def parse(cls, value):
+        """Return a :py:class:`VersionConstraint` object from *value*, which is either a
+        :py:class:`VersionConstraint` object, an expression, or a
+        :py:class:`~stoiridh.qbs.tools.VersionNumber` object. In the latter case, the constraint is
+        satisfied by the version numbers greater than or equal to *value*.
+
+        :raise: :py:exc:`TypeError` if *value* is not one of the types above.
+        :rtype: ~stoiridh.qbs.tools.VersionConstraint
+        """
+        if isinstance(value, VersionConstraint):
+            return value
+        elif isinstance(value, VersionNumber):
+            return cls('>=%s' % value)
+        elif isinstance(value, str):
+            return cls(value)
+
+        raise TypeError('''argument (value) should be a stoiridh.qbs.tools.VersionConstraint, a str,
+                           or a stoiridh.qbs.tools.VersionNumber object, not %r''' % type(value))
+
+    @property
+    def expression(self):
+        """This read-only property returns the expression of the constraint.
+
+        :rtype: str
+        """
+        return self._expression
+
+    @property
+    def minimum(self):
+        """This read-only property returns the smallest version number that may satisfy the
+        constraint, or :py:obj:`None` if the constraint has no lower bound.
+
+        :rtype: ~stoiridh.qbs.tools.VersionNumber or :py:obj:`None`
+        """
+        return VersionNumber(*self._lower) if self._lower else None
+
+    def matches(self, version):
+        """Return :py:data:`True`, if *version* satisfies the constraint; otherwise, return
+        :py:data:`False`.
+
+        :raise: :py:exc:`TypeError` if *version* is not a
+                :py:class:`~stoiridh.qbs.tools.VersionNumber` object.
+        """
+        if not isinstance(version, VersionNumber):
+            raise TypeError('argument (version) should be a stoiridh.qbs.tools.VersionNumber '
+                            'object, not %r' % type(version))
+        return self._match(version._segments)
+
+    def filter(self, versions):
+        """Return the list of the version numbers from *versions* that satisfy the constraint, in
+        their original order.
+
+        The version numbers are checked in a single pass, without any type checking, so *versions*
+        must only contain :py:class:`~stoiridh.qbs.tools.VersionNumber` objects.
+
+        :rtype: list
+        """
+        match = self._match
+        return [v for v in versions if match(v._segments)]
+
+    def best_match(self, versions):
+        """Return the highest version number from *versions* that satisfies the constraint. If
+        there is no such version number, then a :py:obj:`None` type is returned.
+
+        :rtype: ~stoiridh.qbs.tools.VersionNumber or :py:obj:`None`
+        """
+        return max(self.filter(versions), default=None)
+
+    def __contains__(self, version):
+        return isinstance(version, VersionNumber) and self._match(version._segments)
+
+    def __repr__(self):
+        return '<%s expression=%r>' % (self.__class__.__name__, self.expression)
+
+    def __str__(self):
+        return self.expression
@@ -17,13 +17,21 @@
 ##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
 ##                                                                                                ##
 ####################################################################################################
+import functools
 import re
 
 
 class VersionNumber:
     re_version = re.compile(r'^(\d+)\.(\d+)(\.(\d+))?$')
 
-    def __init__(self, *args):
+    # a version number is immutable, its segments are stored in a tuple which is also used as the
+    # ordering key.
+    __slots__ = ('_segments', '_hash')
+
+    # maximum number of parsed version strings held by the cache.
+    CACHE_SIZE = 1024
+
+    def __new__(cls, *args):
         """Construct a :py:class:`VersionNumber` object. *args* corresponds to the major, minor, and
         patch segments and accepts either a :py:obj:`str` object or an :py:obj:`int` object.
 
@@ -36,54 +44,156 @@ class VersionNumber:
             >>> VersionNumber(1, 5, 7)
             1.5.7
 
+        A :py:class:`VersionNumber` object is immutable and hashable, so it can be used as a key of
+        a :py:obj:`dict` or as an item of a :py:obj:`set`.
+
         :raise: :py:exc:`ValueError` if :py:obj:`str` is not a valid version like
                 ``major.minor[.patch]``.
         """
-        self._segments = [1, 0, 0]
+        segments = (1, 0, 0)
 
         if (len(args) > 0):
             arg = args[0]
             if isinstance(arg, VersionNumber):
-                self._segments = arg._segments[:]
+                if type(arg) is cls:
+                    # there is no need to copy an immutable object.
+                    return arg
+                segments = arg._segments
             elif isinstance(arg, str):
-                m = VersionNumber.re_version.match(arg)
-                if m:
-                    self._segments = [int(s) if s else 0 for s in m.group(1, 2, 4)]
-                else:
-                    raise ValueError('The version number is not valid:', arg)
+                return cls._parse(arg)
             elif isinstance(arg, int):
-                for i in range(0, min(3, len(args))):
-                    self._segments[i] = args[i]
+                segments = tuple(args[:3]) + segments[len(args):]
+
+        return cls._from_segments(segments)
+
+    @classmethod
+    def parse_all(cls, strings, sort=True):
+        """Parse all the version strings from the iterable *strings* in one pass and return a tuple
+        of two lists: the :py:class:`VersionNumber` objects and the errors.
+
+        Contrary to the constructor, an invalid item does not raise an exception, either a
+        :py:exc:`ValueError` or a :py:exc:`TypeError`, but is reported in the list of errors under
+        the form of a tuple ``(index, item, exception)``, where *index* is the position of *item*
+        within *strings*.
+
+        Each distinct string is only parsed once, through the same cache as the constructor, so
+        that the same :py:class:`VersionNumber` objects are returned, see :py:meth:`cache_info`. If
+        *sort* is :py:data:`True`, then the version numbers are sorted in ascending order;
+        otherwise, they keep the order of *strings*.
+
+        Example::
+
+            >>> versions, errors = VersionNumber.parse_all(['1.6.0', 'v1.5', '1.5.0', '1.6.0'])
+            >>> [str(v) for v in versions]
+            ['1.5.0', '1.6.0', '1.6.0']
+            >>> errors
+            [(1, 'v1.5', ValueError('The version number is not valid:', 'v1.5'))]
+
+        :rtype: tuple
+        """
+        parse = cls._parse
+        # the version numbers already parsed, along with their packed key, and the invalid strings.
+        parsed = dict()
+        invalid = dict()
+        items = []
+        errors = []
+        # bitwise OR of all the segments, in order to know whether they fit into the packed key.
+        bits = 0
+
+        for index, string in enumerate(strings):
+            if not isinstance(string, str):
+                errors.append((index, string, TypeError('The version number should be a str '
+                                                        'object, not %r' % type(string))))
+                continue
+
+            item = parsed.get(string)
+
+            if item is None and string not in invalid:
+                try:
+                    # the version numbers are shared with the constructor through the cache.
+                    version = parse(string)
+                except ValueError as e:
+                    invalid[string] = e
+                else:
+                    major, minor, patch = version._segments
+                    bits |= major | minor | patch
+                    item = parsed[string] = ((major << 42) | (minor << 21) | patch, version)
+
+            if item is None:
+                errors.append((index, string, invalid[string]))
+                continue
+
+            items.append(item)
+
+        if sort:
+            # the packed keys are faster to compare than the segments, but they are only valid
+            # when each segment fits into 21 bits.
+            if bits < 1 << 21:
+                items.sort(key=lambda item: item[0])
+            else:
+                items.sort(key=lambda item: item[1]._segments)
+
+        return [version for _, version in items], errors
+
+    @classmethod
+    def cache_info(cls):
+        """Return the statistics of the cache of the parsed version strings, under the form of a
+        named tuple of *hits*, *misses*, *maxsize*, and *currsize*.
+
+        Since a :py:class:`VersionNumber` object is immutable, the parsing of the same string
+        returns the same object, as long as it is held by the cache. The cache keeps the
+        :py:attr:`CACHE_SIZE` most recently used version strings.
+
+        Example::
+
+            >>> VersionNumber('1.5.0') is VersionNumber('1.5.0')
+            True
+            >>> VersionNumber.cache_info()
+            CacheInfo(hits=1, misses=1, maxsize=1024, currsize=1)
+        """
+        return cls._parse.cache_info()
+
+    @classmethod
+    def cache_clear(cls):
+        """Clear the cache of the parsed version strings and its statistics."""
+        cls._parse.cache_clear()
+
+    @classmethod
+    @functools.lru_cache(maxsize=CACHE_SIZE)
+    def _parse(cls, string):
+        m = cls.re_version.match(string)
+        if m:
+            major, minor, _, patch = m.groups()
+            return cls._from_segments((int(major), int(minor), int(patch) if patch else 0))
+        raise ValueError('The version number is not valid:', string)
+
+    @classmethod
+    def _from_segments(cls, segments):
+        self = super(VersionNumber, cls).__new__(cls)
+        self._segments = segments
+        self._hash = hash(segments)
+        return self
 
     @property
     def major(self):
-        """This property holds the major segment of the version number."""
+        """This read-only property holds the major segment of the version number."""
         return self._segments[0]
 
-    @major.setter
-    def major(self, value):
-        self._segments[0] = value
-
     @property
     def minor(self):
-        """This property holds the minor segment of the version number."""
+        """This read-only property holds the minor segment of the version number."""
         return self._segments[1]
 
-    @minor.setter
-    def minor(self, value):
-        self._segments[1] = value
-
     @property
     def patch(self):
-        """This property holds the patch segment of the version number."""
+        """This read-only property holds the patch segment of the version number."""
         return self._segments[2]
 
-    @patch.setter
-    def patch(self, value):
-        self._segments[2] = value
-
     def __hash__(self):
-        return hash(tuple([self._segments[i] for i in range(0, 3)]))
+        return self._hash
+
+    def __reduce__(self):
+        return (self.__class__, self._segments)
 
     def __repr__(self):
         return ('<%s major=%s minor=%s patch=%s>'
@@ -95,31 +205,29 @@ class VersionNumber:
     def __eq__(self, other):
         if not isinstance(other, VersionNumber):
             return NotImplemented
-        return vars(self) == vars(other)
+        return self._segments == other._segments
 
     def __ne__(self, other):
-        return not self == other
+        if not isinstance(other, VersionNumber):
+            return NotImplemented
+        return self._segments != other._segments
 
     def __lt__(self, other):
         if not isinstance(other, VersionNumber):
             return NotImplemented
-        return (self.major < other.major) \
-            or (self.major == other.major and self.minor < other.minor) \
-            or (self.minor == other.minor and self.patch < other.patch)
+        return self._segments < other._segments
 
     def __le__(self, other):
         if not isinstance(other, VersionNumber):
             return NotImplemented
-        return self < other or self == other
+        return self._segments <= other._segments
 
     def __gt__(self, other):
         if not isinstance(other, VersionNumber):
             return NotImplemented
-        return (self.major > other.major) \
-            or (self.major == other.major and self.minor > other.minor) \
-            or (self.minor == other.minor and self.patch > other.patch)
+        return self._segments > other._segments
 
     def __ge__(self, other):
         if not isinstance(other, VersionNumber):
             return NotImplemented
-        return self > other or self == other
+        return self._segments >= other._segments
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+import hashlib
+import tempfile
+import unittest
+
+from pathlib import Path
+from unittest import mock
+from stoiridh.qbs.tools import ArchiveCache
+
+
+class TestArchiveCache(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.cachedir = Path(self.tempdir.name, 'archives')
+        self.count = 0
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def archive(self, content):
+        self.count += 1
+        filepath = Path(self.tempdir.name, 'archive-%d.tar.gz' % self.count)
+        filepath.write_bytes(content)
+        return filepath
+
+    def test_invalid_path(self):
+        with self.assertRaises(TypeError):
+            ArchiveCache(None)
+
+    def test_lookup_store(self):
+        cache = ArchiveCache(self.cachedir)
+        self.assertIsNone(cache.lookup('http://host/1.0.0.tar.gz'))
+
+        filepath = self.archive(b'1.0.0')
+        archive = cache.store('http://host/1.0.0.tar.gz', filepath)
+
+        # the archive is moved into the cache, under the name of its digest.
+        self.assertFalse(filepath.exists())
+        self.assertEqual(archive.name, '%s.tar.gz' % hashlib.sha256(b'1.0.0').hexdigest())
+        self.assertEqual(cache.lookup('http://host/1.0.0.tar.gz'), archive)
+        self.assertFalse(cache.filepath.exists())
+
+        cache.save()
+        self.assertTrue(cache.filepath.exists())
+        self.assertEqual(ArchiveCache(self.cachedir).lookup('http://host/1.0.0.tar.gz'), archive)
+
+    def test_same_content(self):
+        cache = ArchiveCache(self.cachedir)
+        a = cache.store('http://a/1.0.0.tar.gz', self.archive(b'1.0.0'))
+        b = cache.store('http://b/1.0.0.tar.gz', self.archive(b'1.0.0'))
+
+        self.assertEqual(a, b)
+        self.assertEqual(cache.size, len(b'1.0.0'))
+        self.assertEqual(len(list(self.cachedir.glob('*.tar.gz'))), 1)
+
+    def test_altered_archive(self):
+        cache = ArchiveCache(self.cachedir)
+        archive = cache.store('http://host/1.0.0.tar.gz', self.archive(b'1.0.0'))
+        archive.write_bytes(b'truncated')
+
+        self.assertIsNone(cache.lookup('http://host/1.0.0.tar.gz'))
+
+    def test_altered_content(self):
+        cache = ArchiveCache(self.cachedir)
+        archive = cache.store('http://host/1.0.0.tar.gz', self.archive(b'1.0.0'))
+        # the size of the archive is unchanged, but not its content.
+        archive.write_bytes(b'1.0.1')
+
+        self.assertIsNone(cache.lookup('http://host/1.0.0.tar.gz'))
+        self.assertFalse(archive.exists())
+        self.assertEqual(cache.size, 0)
+
+    def test_remove(self):
+        cache = ArchiveCache(self.cachedir)
+        archive = cache.store('http://a/1.0.0.tar.gz', self.archive(b'1.0.0'))
+        cache.store('http://b/1.0.0.tar.gz', self.archive(b'1.0.0'))
+        cache.store('http://a/2.0.0.tar.gz', self.archive(b'2.0.0'))
+
+        # the archive is removed for all the URLs it was downloaded from.
+        cache.remove('http://a/1.0.0.tar.gz')
+        cache.remove('http://a/3.0.0.tar.gz')
+
+        self.assertFalse(archive.exists())
+        self.assertIsNone(cache.lookup('http://a/1.0.0.tar.gz'))
+        self.assertIsNone(cache.lookup('http://b/1.0.0.tar.gz'))
+        self.assertIsNotNone(cache.lookup('http://a/2.0.0.tar.gz'))
+        self.assertEqual(cache.size, len(b'2.0.0'))
+
+    def test_eviction(self):
+        cache = ArchiveCache(self.cachedir, max_size=20)
+
+        with mock.patch('time.time', side_effect=range(100)):
+            for i in range(3):
+                cache.store('http://host/%d.0.0.tar.gz' % i, self.archive(b'%d' % i * 10))
+            # the first archive becomes the most recently used one.
+            self.assertIsNotNone(cache.lookup('http://host/0.0.0.tar.gz'))
+            cache.save()
+
+        self.assertEqual(cache.size, 20)
+        self.assertIsNotNone(cache.lookup('http://host/0.0.0.tar.gz'))
+        self.assertIsNone(cache.lookup('http://host/1.0.0.tar.gz'))
+        self.assertIsNotNone(cache.lookup('http://host/2.0.0.tar.gz'))
+        self.assertEqual(len(list(self.cachedir.glob('*.tar.gz'))), 2)
@@ -17,12 +17,16 @@
 ##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
 ##                                                                                                ##
 ####################################################################################################
+import asyncio
+import configparser
 import os
 import unittest
 
 from pathlib import Path
 from shutil import copyfile
-from stoiridh.qbs.tools import qbs, Config, VersionNumber
+from unittest import mock
+from stoiridh.qbs.tools import qbs, Config, FileLock, VersionNumber
+from stoiridh.qbs.tools import config as config_module
 from util.decorators import asyncio_loop
 
 
@@ -34,12 +38,15 @@ class TestConfig(unittest.TestCase):
         # resolve the path to an absolute path before join the configuration file is ok, because the
         # Config.FILENAME (here, sqt.conf) file doesn't exist until the tests has not begun.
         cls.config_file = Path('tests/data').resolve().joinpath(Config.FILENAME)
+        cls.lock_file = Path('tests/data').resolve().joinpath('.%s.lock' % Config.FILENAME)
 
     @classmethod
     def tearDownClass(cls):
         # must wait the ending of the tests before to start the deletion of the configuration file.
         if cls.config_file.exists():
             os.remove(str(cls.config_file))
+        if cls.lock_file.exists():
+            os.remove(str(cls.lock_file))
 
     def setUp(self):
         self.config = Config('tests/data')
@@ -54,6 +61,33 @@ class TestConfig(unittest.TestCase):
 
         self.loop.run_until_complete(wrapper())
 
+    def test_open_await(self):
+        async def wrapper():
+            async with await self.config.open() as cfg:
+                self.assertIs(cfg, self.config)
+                data = await cfg.read('qbs')
+                self.assertEqual(data['version'], '1.5.0')
+
+            cfg = await self.config.open()
+            self.assertIs(cfg, self.config)
+            self.assertEqual(await cfg.read('qbs'), data)
+
+        self.loop.run_until_complete(wrapper())
+
+    def test_read_update_in_memory(self):
+        async def wrapper():
+            async with self.config.open() as cfg:
+                # the data are read and updated without any thread.
+                with mock.patch.object(cfg._loop, 'run_in_executor') as executor:
+                    data = await cfg.read('qbs')
+                    await cfg.update('qbs', {'version': '1.6.0'})
+                    self.assertFalse(executor.called)
+
+            async with self.config.open() as cfg:
+                self.assertEqual(await cfg.read('qbs'), dict(data, version='1.6.0'))
+
+        self.loop.run_until_complete(wrapper())
+
     def test_read(self):
         async def wrapper():
             async with self.config.open() as cfg:
@@ -95,6 +129,156 @@ class TestConfig(unittest.TestCase):
 
         self.loop.run_until_complete(wrapper())
 
+    def test_update_unchanged(self):
+        filepath = self.config.path.joinpath(Config.FILENAME)
+        st = os.stat(str(filepath))
+
+        async def wrapper():
+            async with self.config.open() as cfg:
+                await cfg.read('qbs')
+                self.assertEqual(cfg.dirty, frozenset())
+
+            async with self.config.open() as cfg:
+                data = await cfg.read('qbs')
+                await cfg.update('qbs', data)
+                await cfg.update('observers', {})
+                self.assertEqual(cfg.dirty, frozenset())
+
+        self.loop.run_until_complete(wrapper())
+
+        # the configuration file is not written when no section changed.
+        self.assertEqual(os.stat(str(filepath)).st_ino, st.st_ino)
+        self.assertEqual(os.stat(str(filepath)).st_mtime_ns, st.st_mtime_ns)
+
+    def test_update_atomic(self):
+        filepath = self.config.path.joinpath(Config.FILENAME)
+        os.chmod(str(filepath), 0o640)
+        st = os.stat(str(filepath))
+
+        async def wrapper():
+            async with self.config.open() as cfg:
+                await cfg.update('qbs', {'version': '1.6.0'})
+                self.assertEqual(cfg.dirty, frozenset(['qbs']))
+
+        self.loop.run_until_complete(wrapper())
+
+        # the configuration file is replaced, rather than written in place.
+        self.assertNotEqual(os.stat(str(filepath)).st_ino, st.st_ino)
+        self.assertEqual(os.stat(str(filepath)).st_mode, st.st_mode)
+        self.assertEqual([f for f in os.listdir(str(self.config.path))
+                          if f.startswith('.') and f != self.config.lock.path.name], [])
+
+        async def check():
+            async with self.config.open() as cfg:
+                self.assertEqual(await cfg.read('qbs'), {'filepath': '/usr/bin/qbs',
+                                                         'version': '1.6.0'})
+
+        self.loop.run_until_complete(check())
+
+    def test_update_merge(self):
+        other = Config('tests/data')
+
+        async def wrapper():
+            async with self.config.open() as cfg, other.open() as cfg2:
+                await cfg.update('fringe', {'walter': 'bishop'})
+                await cfg2.update('observers', {'september': 'observer'})
+                await cfg2.update('qbs', {'version': '1.6.0'})
+                # the second configuration, which does not know the 'fringe' section, must not
+                # remove it.
+                self.assertIsNone(await cfg2.read('fringe'))
+
+            # the sections changed by each configuration are kept.
+            async with self.config.open() as cfg:
+                self.assertEqual(await cfg.read('fringe'), {'walter': 'bishop'})
+                self.assertEqual(await cfg.read('observers'), {'september': 'observer'})
+                self.assertEqual((await cfg.read('qbs'))['version'], '1.6.0')
+
+            async with other.open() as cfg2:
+                await cfg2.update('fringe', {}, reset=True)
+
+            async with self.config.open() as cfg:
+                self.assertIsNone(await cfg.read('fringe'))
+                self.assertEqual(await cfg.read('observers'), {'september': 'observer'})
+
+        self.loop.run_until_complete(wrapper())
+
+    def test_update_locked(self):
+        filepath = self.config.path.joinpath(Config.FILENAME)
+        content = filepath.read_bytes()
+        lock = FileLock(self.config.lock.path)
+        lock.acquire()
+
+        async def wrapper():
+            # the configuration file is read while another process writes it.
+            async with self.config.open() as cfg:
+                await cfg.update('fringe', {'walter': 'bishop'})
+                self.assertEqual((await cfg.read('qbs'))['version'], '1.5.0')
+
+        task = asyncio.ensure_future(wrapper(), loop=self.loop)
+        self.loop.run_until_complete(asyncio.sleep(0.1))
+        self.assertFalse(task.done())
+        self.assertEqual(filepath.read_bytes(), content)
+
+        lock.release()
+        self.loop.run_until_complete(task)
+        self.assertNotEqual(filepath.read_bytes(), content)
+
+    def test_cache(self):
+        filepath = self.config.path.joinpath(Config.FILENAME)
+        configs = [Config('tests/data') for _ in range(10)]
+
+        async def read():
+            data = []
+            for config in configs:
+                async with config.open() as cfg:
+                    data.append(await cfg.read('qbs'))
+            return data
+
+        # the configuration file is parsed once for all the Config objects.
+        parses = config_module._cache.parses
+        data = self.loop.run_until_complete(read())
+        self.assertEqual(config_module._cache.parses, parses + 1)
+        self.assertEqual(data, [data[0]] * len(configs))
+
+        async def update():
+            async with configs[0].open() as cfg:
+                await cfg.update('qbs', {'version': '1.6.0'})
+                # the other objects are not affected until the configuration file is written.
+                async with configs[1].open() as cfg2:
+                    self.assertEqual((await cfg2.read('qbs'))['version'], '1.5.0')
+
+        # the configuration file written by this process is not parsed again.
+        self.loop.run_until_complete(update())
+        data = self.loop.run_until_complete(read())
+        self.assertEqual(config_module._cache.parses, parses + 1)
+        self.assertEqual({d['version'] for d in data}, {'1.6.0'})
+
+        # the configuration file written by another process is parsed again.
+        filepath.write_text('[qbs]\nversion = 1.7.0\n', encoding='utf-8')
+        data = self.loop.run_until_complete(read())
+        self.assertEqual(config_module._cache.parses, parses + 2)
+        self.assertEqual(data, [{'version': '1.7.0'}] * len(configs))
+
+    def test_update_defaults(self):
+        filepath = self.config.path.joinpath(Config.FILENAME)
+        filepath.write_text('[DEFAULT]\nroot = /opt\n\n[qbs]\nfilepath = /usr/bin/qbs\n'
+                            'version = 1.5.0\n', encoding='utf-8')
+
+        async def wrapper():
+            async with self.config.open() as cfg:
+                await cfg.update('qbs', {'version': '1.6.0'})
+                await cfg.update('fringe', {'root': '/srv'})
+                await cfg.update('observers', {})
+
+        self.loop.run_until_complete(wrapper())
+
+        # the options of the DEFAULT section are not copied into the updated sections.
+        written = configparser.ConfigParser(default_section='', interpolation=None)
+        written.read_string(filepath.read_text(encoding='utf-8'))
+        self.assertEqual(written.sections(), ['DEFAULT', 'qbs', 'fringe'])
+        self.assertEqual(dict(written['qbs']), {'filepath': '/usr/bin/qbs', 'version': '1.6.0'})
+        self.assertEqual(dict(written['fringe']), {'root': '/srv'})
+
     def test_update_data_typerror(self):
         async def wrapper():
             async with self.config.open() as cfg:
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from pathlib import Path
+from stoiridh.qbs.tools import FileLock
+
+
+class TestFileLock(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tempdir.name, 'locks', 'install.lock')
+        self.lock = FileLock(self.path)
+
+    def tearDown(self):
+        if self.lock.locked:
+            self.lock.release()
+        self.tempdir.cleanup()
+
+    def test_path(self):
+        self.assertEqual(FileLock(str(self.path)).path, self.path)
+        self.assertRaises(TypeError, FileLock, None)
+
+    def test_acquire_release(self):
+        self.assertFalse(self.lock.locked)
+
+        with self.lock:
+            self.assertTrue(self.lock.locked)
+            self.assertTrue(self.path.exists())
+            self.assertRaises(RuntimeError, self.lock.acquire)
+
+        self.assertFalse(self.lock.locked)
+        self.assertRaises(RuntimeError, self.lock.release)
+
+    def test_exclusive(self):
+        other = FileLock(self.path)
+
+        self.assertTrue(self.lock.acquire(blocking=False))
+        self.assertFalse(other.acquire(blocking=False))
+        self.assertFalse(other.locked)
+
+        self.lock.release()
+        self.assertTrue(other.acquire(blocking=False))
+        other.release()
+
+    def test_other_process(self):
+        script = ('import sys\n'
+                  'from stoiridh.qbs.tools import FileLock\n'
+                  'lock = FileLock(sys.argv[1])\n'
+                  'lock.acquire()\n'
+                  'print("locked", flush=True)\n'
+                  'sys.stdin.read()\n')
+
+        with subprocess.Popen([sys.executable, '-c', script, str(self.path)],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              universal_newlines=True) as process:
+            self.assertEqual(process.stdout.readline().strip(), 'locked')
+            self.assertFalse(self.lock.acquire(blocking=False))
+            process.stdin.close()
+
+        # the lock is released when the process exits.
+        self.assertTrue(self.lock.acquire(blocking=False))
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+import hashlib
+import os
+import tempfile
+import unittest
+
+from pathlib import Path
+from stoiridh.qbs.tools import Manifest
+
+
+class TestManifest(unittest.TestCase):
+    FILES = {'imports/Stoiridh/Utils/Utils.qbs': b'Module {}',
+             'modules/Python/python.qbs': b'Module { property string version }',
+             'python/stoiridh.py': b'import sys\n'}
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tempdir.name)
+
+        for name, content in self.FILES.items():
+            filepath = self.path.joinpath(name)
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            filepath.write_bytes(content)
+
+        self.manifest = Manifest.build(self.path)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_build(self):
+        self.assertEqual(sorted(self.manifest.entries), sorted(self.FILES))
+
+        for name, content in self.FILES.items():
+            with self.subTest(name):
+                size, mtime, digest = self.manifest.entries[name]
+                self.assertEqual(size, len(content))
+                self.assertEqual(mtime, os.stat(str(self.path.joinpath(name))).st_mtime_ns)
+                self.assertEqual(digest, hashlib.sha256(content).hexdigest())
+
+    def test_read_write(self):
+        filepath = self.path.joinpath(Manifest.FILENAME)
+        self.manifest.write(filepath)
+
+        self.assertEqual(Manifest.read(filepath), self.manifest)
+        # the manifest does not list itself.
+        self.assertEqual(Manifest.build(self.path), self.manifest)
+
+        filepath.write_text('invalid')
+        with self.assertRaises(ValueError):
+            Manifest.read(filepath)
+
+    def test_verify(self):
+        self.assertEqual(self.manifest.verify(self.path), [])
+        self.assertEqual(self.manifest.verify(self.path, hash=True), [])
+
+        self.path.joinpath('python/stoiridh.py').unlink()
+        self.path.joinpath('modules/Python/python.qbs').write_bytes(b'')
+        filepath = self.path.joinpath('imports/Stoiridh/Utils/Utils.qbs')
+        filepath.write_bytes(b'Module {{')
+
+        self.assertEqual(self.manifest.verify(self.path),
+                         [('imports/Stoiridh/Utils/Utils.qbs', Manifest.MTIME),
+                          ('modules/Python/python.qbs', Manifest.SIZE),
+                          ('python/stoiridh.py', Manifest.MISSING)])
+
+        # a file is hashed only when asked, whatever its modification time.
+        filepath.write_bytes(b'Module {}')
+        st = os.stat(str(filepath))
+        os.utime(str(filepath), ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        self.assertEqual(self.manifest.verify(self.path, hash=True, workers=2),
+                         [('modules/Python/python.qbs', Manifest.SIZE),
+                          ('python/stoiridh.py', Manifest.MISSING)])
+
+        filepath.write_bytes(b'Module {|')
+        self.assertIn(('imports/Stoiridh/Utils/Utils.qbs', Manifest.HASH),
+                      self.manifest.verify(self.path, hash=True))
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+import tempfile
+import unittest
+
+from pathlib import Path
+from unittest import mock
+from stoiridh.qbs.tools import Manifest, ObjectStore
+
+
+class TestObjectStore(unittest.TestCase):
+    FILES = {'1.0.0/modules/Python/python.qbs': b'Module { property string version }',
+             '1.0.0/python/stoiridh.py': b'import sys\n',
+             '1.1.0/modules/Python/python.qbs': b'Module { property string version }',
+             '1.1.0/python/stoiridh.py': b'import os\n'}
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tempdir.name)
+        self.store = ObjectStore(self.path.joinpath('objects'))
+
+        for name, content in self.FILES.items():
+            filepath = self.path.joinpath('source', name)
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            filepath.write_bytes(content)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def objects(self):
+        return sorted(f.name for f in self.store.path.glob('*/*') if f.is_file())
+
+    def test_path(self):
+        self.assertEqual(ObjectStore(str(self.path)).path, self.path)
+        self.assertRaises(TypeError, ObjectStore, None)
+
+    def test_deduplicate(self):
+        manifests = dict()
+
+        for version in ('1.0.0', '1.1.0'):
+            path = self.path.joinpath('source', version)
+            manifests[version] = self.store.deduplicate(path)
+            self.assertEqual(manifests[version], Manifest.build(path))
+            self.assertEqual(manifests[version].verify(path, hash=True), [])
+
+        digests = {e[2] for m in manifests.values() for e in m.entries.values()}
+        self.assertEqual(self.objects(), sorted(digests))
+
+        for name, content in self.FILES.items():
+            with self.subTest(name):
+                filepath = self.path.joinpath('source', name)
+                self.assertEqual(filepath.read_bytes(), content)
+                self.assertEqual(self.store.object_path(Manifest.hash(filepath)).read_bytes(),
+                                 content)
+
+    def test_link_fallback(self):
+        # without reflinks, nor hard links, the files are copied.
+        self.store._reflinks = False
+        path = self.path.joinpath('source', '1.0.0')
+
+        with mock.patch('os.link', side_effect=OSError('unsupported')):
+            manifest = self.store.deduplicate(path)
+
+        self.assertEqual(manifest.verify(path, hash=True), [])
+        self.assertEqual(len(self.objects()), 2)
+
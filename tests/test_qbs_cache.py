@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+import os
+import sys
+import tempfile
+import unittest
+
+from pathlib import Path
+from unittest import mock
+from stoiridh.qbs.tools import qbs, VersionNumber
+from util.decorators import asyncio_loop
+from util.fakeqbs import make_fake_qbs
+
+
+@asyncio_loop
+@unittest.skipIf(sys.platform.startswith('win32'), 'the fake Qbs executable is a shell script.')
+class TestScanCache(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.bindir = Path(self.tempdir.name, 'bin')
+        self.bindir.mkdir()
+        self.cachedir = Path(self.tempdir.name, 'cache')
+        self.executable = make_fake_qbs(self.bindir, '1.6.0')
+
+        self.environ = mock.patch.dict(os.environ, {'PATH': str(self.bindir)})
+        self.environ.start()
+        os.environ.pop('QBS_HOME', None)
+
+    def tearDown(self):
+        self.environ.stop()
+        self.tempdir.cleanup()
+
+    def scan(self):
+        scanner = qbs.Scanner(cache=qbs.ScanCache(self.cachedir))
+        spawn = mock.patch.object(qbs.Scanner, '_spawn_process', autospec=True,
+                                  side_effect=qbs.Scanner._spawn_process)
+        with spawn as m:
+            result = TestScanCache.loop.run_until_complete(scanner.scan())
+        return result, m.call_count
+
+    def test_lookup_store(self):
+        cache = qbs.ScanCache(self.cachedir)
+        self.assertIsNone(cache.lookup(self.executable))
+
+        cache.store(self.executable, VersionNumber('1.6.0'))
+        self.assertEqual(cache.lookup(self.executable), VersionNumber('1.6.0'))
+        self.assertFalse(cache.filepath.exists())
+
+        cache.save()
+        self.assertTrue(cache.filepath.exists())
+        self.assertEqual(qbs.ScanCache(self.cachedir).lookup(self.executable),
+                         VersionNumber('1.6.0'))
+
+    def test_warm_scan(self):
+        result, calls = self.scan()
+        self.assertEqual(result, qbs.Qbs(self.executable, '1.6.0'))
+        self.assertEqual(calls, 1)
+
+        result, calls = self.scan()
+        self.assertEqual(result, qbs.Qbs(self.executable, '1.6.0'))
+        self.assertEqual(calls, 0)
+
+    def test_broken_executable(self):
+        cache = qbs.ScanCache(self.cachedir)
+        cache.store(self.executable, None)
+        self.assertIsNone(cache.lookup(self.executable, 'missing'))
+        self.assertEqual(cache.lookup(self.bindir.joinpath('other'), 'missing'), 'missing')
+
+        cache.save()
+        self.assertIsNone(qbs.ScanCache(self.cachedir).lookup(self.executable, 'missing'))
+
+    def test_warm_scan_broken(self):
+        make_fake_qbs(self.bindir, 'unknown')
+
+        # the executable that displays no version number is not spawned again.
+        result, calls = self.scan()
+        self.assertIsNone(result)
+        self.assertEqual(calls, 1)
+
+        result, calls = self.scan()
+        self.assertIsNone(result)
+        self.assertEqual(calls, 0)
+
+        make_fake_qbs(self.bindir, '1.7.0')
+        result, calls = self.scan()
+        self.assertEqual(result.version, VersionNumber('1.7.0'))
+        self.assertEqual(calls, 1)
+
+    def test_identity_changed(self):
+        self.scan()
+
+        make_fake_qbs(self.bindir, '1.7.0')
+        os.utime(str(self.executable), ns=(0, 0))
+
+        result, calls = self.scan()
+        self.assertEqual(result.version, VersionNumber('1.7.0'))
+        self.assertEqual(calls, 1)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+import unittest
+
+from stoiridh.qbs.tools import VersionConstraint, VersionNumber
+from stoiridh.qbs.tools.qbs import Inventory, Qbs
+
+
+class TestInventory(unittest.TestCase):
+    def setUp(self):
+        self.inventory = Inventory([Qbs('/opt/qt55/bin/qbs', '1.4.5'),
+                                    Qbs('/opt/qt56/bin/qbs', '1.5.0'),
+                                    Qbs('/usr/bin/qbs', '1.5.0'),
+                                    Qbs('/opt/qt57/bin/qbs', '1.6.0')])
+
+    def test_init_typeerror(self):
+        with self.assertRaises(TypeError):
+            Inventory(['/usr/bin/qbs'])
+
+    def test_order(self):
+        self.assertEqual(len(self.inventory), 4)
+        self.assertEqual([str(qbs.filepath) for qbs in self.inventory],
+                         ['/opt/qt57/bin/qbs', '/opt/qt56/bin/qbs', '/usr/bin/qbs',
+                          '/opt/qt55/bin/qbs'])
+
+    def test_matches(self):
+        self.assertEqual(self.inventory.matches(VersionNumber('1.5.0')), list(self.inventory)[:3])
+        self.assertEqual(self.inventory.matches(VersionNumber('1.7.0')), [])
+        self.assertEqual([str(qbs.filepath) for qbs in self.inventory.matches('<1.6, !=1.4.5')],
+                         ['/opt/qt56/bin/qbs', '/usr/bin/qbs'])
+
+        with self.assertRaises(TypeError):
+            self.inventory.matches(1.5)
+
+    def test_best_match(self):
+        self.assertEqual(self.inventory.best_match(VersionNumber('1.4.0')),
+                         Qbs('/opt/qt57/bin/qbs', '1.6.0'))
+        self.assertIsNone(self.inventory.best_match(VersionNumber('2.0.0')))
+        self.assertIsNone(Inventory([]).best_match(VersionNumber('1.0.0')))
+        self.assertEqual(self.inventory.best_match(VersionConstraint('<1.5')),
+                         Qbs('/opt/qt55/bin/qbs', '1.4.5'))
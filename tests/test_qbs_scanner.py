@@ -17,10 +17,17 @@
 ##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
 ##                                                                                                ##
 ####################################################################################################
+import os
+import sys
+import tempfile
+import time
 import unittest
 
+from pathlib import Path
+from unittest import mock
 from stoiridh.qbs.tools import qbs, VersionNumber
 from util.decorators import asyncio_loop
+from util.fakeqbs import SLEEP, make_fake_qbs
 
 
 @asyncio_loop
@@ -33,7 +40,127 @@ class TestQbsScanner(unittest.TestCase):
         self.scanner = qbs.Scanner(minimum_version=VersionNumber('1.4.5'))
         self.assertEqual(self.scanner.minimum_version, VersionNumber('1.4.5'))
 
+    def test_constraint(self):
+        self.assertEqual(self.scanner.constraint.expression, '>=1.5.0')
+        self.scanner = qbs.Scanner(constraint='>=1.4, <1.6')
+        self.assertEqual(self.scanner.minimum_version, VersionNumber('1.4.0'))
+        self.assertIsNone(qbs.Scanner(constraint='<1.6').minimum_version)
+
     def test_scan(self):
         qbs = TestQbsScanner.loop.run_until_complete(self.scanner.scan())
         self.assertIsNotNone(qbs)
         self.assertGreaterEqual(qbs.version, VersionNumber('1.5.0'))
+
+
+@asyncio_loop
+@unittest.skipIf(sys.platform.startswith('win32'), 'the fake Qbs executable is a shell script.')
+class TestQbsScannerFakePath(unittest.TestCase):
+    # versions of the fake Qbs executables, in the order of the PATH environment variable.
+    VERSIONS = ['1.4.0', '1.4.5', '1.6.0', '1.5.0', '1.7.0', '1.3.0']
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.paths = []
+
+        for i, version in enumerate(self.VERSIONS):
+            path = Path(self.tempdir.name, str(i))
+            path.mkdir()
+            make_fake_qbs(path, version)
+            self.paths.append(str(path))
+
+        # a directory without any Qbs executable
+        self.paths.insert(1, str(Path(self.tempdir.name, 'missing')))
+
+        self.environ = mock.patch.dict(os.environ, {'PATH': ':'.join(self.paths)})
+        self.environ.start()
+        os.environ.pop('QBS_HOME', None)
+
+    def tearDown(self):
+        self.environ.stop()
+        self.tempdir.cleanup()
+
+    def scan(self, scanner, **kwargs):
+        return TestQbsScannerFakePath.loop.run_until_complete(scanner.scan(**kwargs))
+
+    def test_scan_sequentially(self):
+        result = self.scan(qbs.Scanner())
+        self.assertEqual(result.version, VersionNumber('1.6.0'))
+
+    def test_scan_concurrently(self):
+        for version in ['1.0.0', '1.4.5', '1.5.0', '1.7.0', '1.8.0']:
+            scanner = qbs.Scanner(minimum_version=VersionNumber(version))
+            with self.subTest(version):
+                self.assertEqual(self.scan(scanner, concurrency=4), self.scan(scanner))
+
+    def test_scan_constraint(self):
+        scanner = qbs.Scanner(constraint='>=1.4.1, <1.7, !=1.6.0')
+        self.assertEqual(self.scan(scanner).version, VersionNumber('1.4.5'))
+        self.assertEqual(self.scan(scanner, concurrency=4).version, VersionNumber('1.4.5'))
+
+        scanner = qbs.Scanner(constraint='>1.4.5, <1.7, !=1.6.0')
+        self.assertEqual(self.scan(scanner).version, VersionNumber('1.5.0'))
+
+    def test_scan_concurrently_qbs_home(self):
+        home = Path(self.tempdir.name, 'home')
+        home.joinpath('bin').mkdir(parents=True)
+        make_fake_qbs(home.joinpath('bin'), '1.5.5')
+
+        with mock.patch.dict(os.environ, {'QBS_HOME': str(home)}):
+            result = self.scan(qbs.Scanner(), concurrency=4)
+            self.assertEqual(result.version, VersionNumber('1.5.5'))
+
+    def test_scan_all(self):
+        # a symbolic link to the first directory and a repeated entry of the PATH environment
+        # variable must not lead to duplicates.
+        link = Path(self.tempdir.name, 'link')
+        link.symlink_to(self.paths[0], target_is_directory=True)
+        path = ':'.join(self.paths + [str(link), self.paths[2]])
+
+        root = Path(self.tempdir.name, 'root')
+        root.joinpath('bin').mkdir(parents=True)
+        make_fake_qbs(root.joinpath('bin'), '1.5.0')
+
+        with mock.patch.dict(os.environ, {'PATH': path}):
+            scanner = qbs.Scanner()
+            inventory = self.scan_all(scanner, paths=[str(root)])
+            self.assertEqual(len(inventory), len(self.VERSIONS) + 1)
+            self.assertEqual([str(q.version) for q in inventory],
+                             ['1.7.0', '1.6.0', '1.5.0', '1.5.0', '1.4.5', '1.4.0', '1.3.0'])
+            # the equal versions are ordered as they were found
+            self.assertEqual(inventory[2].path, Path(self.paths[4]))
+            self.assertEqual(inventory[3].path, root.joinpath('bin'))
+            self.assertEqual(self.scan_all(scanner, paths=[str(root)], concurrency=4).matches(
+                VersionNumber('1.0.0')), list(inventory))
+
+    def test_chunked_output(self):
+        # the version number is written in two chunks.
+        filepath = Path(self.paths[0], 'qbs')
+        filepath.write_text('#!/bin/sh\nprintf 1.\n%s 0.2\necho 8.0\n' % SLEEP)
+
+        result = self.scan(qbs.Scanner())
+        self.assertEqual(result.filepath, filepath)
+        self.assertEqual(result.version, VersionNumber('1.8.0'))
+
+    def test_timeout(self):
+        make_fake_qbs(self.paths[0], '1.6.0', delay=30)
+
+        scanner = qbs.Scanner(minimum_version=VersionNumber('1.6.0'), timeout=0.2)
+        self.assertEqual(scanner.timeout, 0.2)
+
+        start = time.monotonic()
+        result = self.scan(scanner)
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertEqual(result.filepath, Path(self.paths[3], 'qbs'))
+
+    def test_cancel_remaining_probes(self):
+        make_fake_qbs(self.paths[0], '1.6.0')
+        for path in self.paths[2:]:
+            make_fake_qbs(path, '1.6.0', delay=30)
+
+        start = time.monotonic()
+        result = self.scan(qbs.Scanner(), concurrency=8)
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertEqual(result.filepath, Path(self.paths[0], 'qbs'))
+
+    def scan_all(self, scanner, **kwargs):
+        return TestQbsScannerFakePath.loop.run_until_complete(scanner.scan_all(**kwargs))
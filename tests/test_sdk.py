@@ -17,14 +17,118 @@
 ##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
 ##                                                                                                ##
 ####################################################################################################
+import asyncio
+import errno
+import gzip
+import io
 import os
 import shutil
 import sys
+import tarfile
+import tempfile
+import threading
+import time
 import unittest
 
 from pathlib import Path
-from stoiridh.qbs.tools import SDK
+from unittest import mock
+from stoiridh.qbs.tools import SDK, DirectorySource, FileLock, Manifest, URLSource
+from stoiridh.qbs.tools.sdk import _CopyEngine, _DownloadScheduler, _Extractor, _Package
 from util.decorators import asyncio_loop
+from util.httpserver import HTTPServer, RequestHandler
+
+
+class UnreliableRequestHandler(RequestHandler):
+    """Serve the 1.1.0 archive for any version, fail the first request of each version with a 503
+    status code and keep track of the number of requests handled at the same time."""
+    lock = threading.Lock()
+    failures = set()
+    running = 0
+    max_running = 0
+    requests = 0
+
+    @classmethod
+    def reset(cls):
+        cls.failures = set()
+        cls.running = cls.max_running = cls.requests = 0
+
+    def do_GET(self):
+        cls = UnreliableRequestHandler
+        with cls.lock:
+            fail = self.path not in cls.failures
+            cls.failures.add(self.path)
+            cls.running += 1
+            cls.requests += 1
+            cls.max_running = max(cls.max_running, cls.running)
+        time.sleep(0.05)
+        # the request is no longer counted once the client is able to receive the response.
+        with cls.lock:
+            cls.running -= 1
+        if fail:
+            self.send_error(503)
+        else:
+            self.path = '/1.1.0.tar.gz'
+            super().do_GET()
+
+
+class DroppingRequestHandler(RequestHandler):
+    """Drop the connection of the first request of each path halfway through the transfer and keep
+    track of the ranges requested."""
+    lock = threading.Lock()
+    dropped = set()
+    ranges = []
+    sent = 0
+
+    @classmethod
+    def reset(cls):
+        cls.dropped = set()
+        cls.ranges = []
+        cls.sent = 0
+
+    def do_GET(self):
+        cls = DroppingRequestHandler
+        with cls.lock:
+            self.drop = self.path not in cls.dropped
+            cls.dropped.add(self.path)
+            cls.ranges.append((self.path, self.headers.get('Range')))
+        super().do_GET()
+
+    def copyfile(self, source, outputfile):
+        data = source.read()
+        if self.drop:
+            data = data[:len(data) // 2]
+            self.close_connection = True
+        with DroppingRequestHandler.lock:
+            DroppingRequestHandler.sent += len(data)
+        outputfile.write(data)
+
+
+class StallingRequestHandler(RequestHandler):
+    """Stall the first request of each path halfway through the transfer, for longer than the
+    download timeout of the tests."""
+    lock = threading.Lock()
+    stalled = set()
+
+    @classmethod
+    def reset(cls):
+        cls.stalled = set()
+
+    def do_GET(self):
+        cls = StallingRequestHandler
+        with cls.lock:
+            self.stall = self.path not in cls.stalled
+            cls.stalled.add(self.path)
+        super().do_GET()
+
+    def copyfile(self, source, outputfile):
+        data = source.read()
+        if self.stall:
+            outputfile.write(data[:len(data) // 2])
+            outputfile.flush()
+            time.sleep(1.0)
+            self.close_connection = True
+        else:
+            outputfile.write(data)
 
 
 @asyncio_loop
@@ -52,6 +156,7 @@ class TestSDK(unittest.TestCase):
             cls.INSTALL_ROOT_PATH = Path(os.environ['APPDATA'], SDK.ROOT_DIR)
 
         cls.QBS_ROOT_PATH = cls.INSTALL_ROOT_PATH.joinpath('qbs')
+        cls.DATA_DIR = datadir
 
     def setUp(self):
         self.sdk = SDK(TestSDK.VERSIONS)
@@ -77,6 +182,11 @@ class TestSDK(unittest.TestCase):
             self.assertEqual(packages[i].url,
                              SDK.URL.format(version=TestSDK.VERSIONS[i]))
 
+    def test_constraint(self):
+        sdk = SDK(TestSDK.VERSIONS, constraint='<1.2')
+        self.assertEqual([str(p.version) for p in sdk.packages], ['1.1.0'])
+        self.assertEqual(SDK(TestSDK.VERSIONS, constraint='>=2.0').packages, [])
+
     def test_noninstalled_packages(self):
         packages = list(self.sdk.noninstalled_packages)
         self.assertEqual(len(packages), len(TestSDK.VERSIONS))
@@ -97,3 +207,692 @@ class TestSDK(unittest.TestCase):
         for version in TestSDK.VERSIONS:
             package = TestSDK.QBS_ROOT_PATH.joinpath(version)
             self.assertTrue(package.exists())
+
+    def test_install_progress(self):
+        reports = []
+
+        def progress(package, transferred, total):
+            reports.append((package.name, transferred, total))
+
+        with HTTPServer(TestSDK.DATA_DIR) as server, \
+                mock.patch.object(SDK, 'URL', server.url + '/{version}.tar.gz'), \
+                mock.patch.object(_Package, 'CHUNK_SIZE', 1024):
+            sdk = SDK(TestSDK.VERSIONS)
+            TestSDK.loop.run_until_complete(sdk.install(progress=progress))
+
+        for version in TestSDK.VERSIONS:
+            with self.subTest(version):
+                self.assertTrue(TestSDK.QBS_ROOT_PATH.joinpath(version).exists())
+
+                size = TestSDK.DATA_DIR.joinpath('%s.tar.gz' % version).stat().st_size
+                transfers = [r[1:] for r in reports if r[0] == version]
+                # the package is downloaded chunk by chunk
+                self.assertEqual(len(transfers), -(-size // 1024))
+                self.assertEqual(transfers[-1], (size, size))
+                self.assertEqual([t for t, _ in transfers], sorted(t for t, _ in transfers))
+
+    def test_install_scheduler(self):
+        UnreliableRequestHandler.reset()
+        versions = ['2.%d.0' % i for i in range(6)]
+
+        with HTTPServer(TestSDK.DATA_DIR, UnreliableRequestHandler) as server, \
+                mock.patch.object(SDK, 'URL', server.url + '/{version}.tar.gz'), \
+                mock.patch.object(SDK, 'MAX_DOWNLOADS_PER_HOST', 2), \
+                mock.patch.object(SDK, 'DOWNLOAD_RETRY_DELAY', 0.01):
+            sdk = SDK(versions)
+            TestSDK.loop.run_until_complete(sdk.install())
+
+        # each download failed once, then it was retried
+        self.assertEqual(len(UnreliableRequestHandler.failures), len(versions))
+        self.assertEqual(UnreliableRequestHandler.max_running, 2)
+        self.assertEqual(list(sdk.noninstalled_packages), [])
+
+    def test_install_retries_exhausted(self):
+        UnreliableRequestHandler.reset()
+
+        with HTTPServer(TestSDK.DATA_DIR, UnreliableRequestHandler) as server, \
+                mock.patch.object(SDK, 'URL', server.url + '/{version}.tar.gz'), \
+                mock.patch.object(SDK, 'DOWNLOAD_RETRIES', 0):
+            sdk = SDK(TestSDK.VERSIONS)
+            TestSDK.loop.run_until_complete(sdk.install())
+
+        self.assertEqual(len(list(sdk.noninstalled_packages)), len(TestSDK.VERSIONS))
+
+    def test_install_pipeline(self):
+        # the download of 2.1.0 is held until 2.0.0 is installed, which is only possible if the
+        # packages go through the stages independently of each other.
+        installed = threading.Event()
+        held = []
+
+        class RequestHandler(UnreliableRequestHandler):
+            def do_GET(self):
+                if self.path.endswith('/2.1.0.tar.gz'):
+                    held.append(not installed.wait(timeout=5))
+                self.path = '/1.1.0.tar.gz'
+                super(UnreliableRequestHandler, self).do_GET()
+
+        move = _Package._move
+
+        def _move(package):
+            move(package)
+            installed.set()
+
+        with HTTPServer(TestSDK.DATA_DIR, RequestHandler) as server, \
+                mock.patch.object(SDK, 'URL', server.url + '/{version}.tar.gz'), \
+                mock.patch.object(_Package, '_move', _move), \
+                mock.patch.object(SDK, 'STREAMING', False):
+            sdk = SDK(['2.0.0', '2.1.0'])
+            TestSDK.loop.run_until_complete(sdk.install())
+
+        self.assertEqual(held, [False])
+        self.assertEqual(list(sdk.noninstalled_packages), [])
+
+        for name, timings in sdk.timings.items():
+            with self.subTest(name):
+                self.assertEqual(sorted(timings), ['download', 'extract', 'install'])
+                self.assertTrue(all(t >= 0 for t in timings.values()))
+
+    def test_install_streaming(self):
+        files = dict()
+
+        for streaming in (False, True):
+            with mock.patch.object(SDK, 'STREAMING', streaming):
+                sdk = SDK(TestSDK.VERSIONS)
+                TestSDK.loop.run_until_complete(sdk.install())
+
+            files[streaming] = sorted(str(p.relative_to(TestSDK.QBS_ROOT_PATH))
+                                      for p in TestSDK.QBS_ROOT_PATH.glob('**/*'))
+            sdk.clean()
+
+        # the streamed packages are the same as the extracted ones, without any staging directory.
+        self.assertTrue(files[True])
+        self.assertEqual(files[True], files[False])
+
+    def test_install_archive_cache(self):
+        for streaming in (False, True):
+            with self.subTest(streaming=streaming):
+                UnreliableRequestHandler.reset()
+
+                with HTTPServer(TestSDK.DATA_DIR, UnreliableRequestHandler) as server, \
+                        mock.patch.object(SDK, 'URL', server.url + '/{version}.tar.gz'), \
+                        mock.patch.object(SDK, 'STREAMING', streaming), \
+                        mock.patch.object(SDK, 'DOWNLOAD_RETRY_DELAY', 0.01):
+                    sdk = SDK(TestSDK.VERSIONS)
+                    TestSDK.loop.run_until_complete(sdk.install())
+                    requests = UnreliableRequestHandler.requests
+
+                    # the archives are installed again from the cache only.
+                    sdk.clean()
+                    sdk = SDK(TestSDK.VERSIONS)
+                    TestSDK.loop.run_until_complete(sdk.install())
+
+                self.assertEqual(UnreliableRequestHandler.requests, requests)
+                self.assertEqual(list(sdk.noninstalled_packages), [])
+                for url in (p.url for p in sdk.packages):
+                    self.assertIsNotNone(sdk.archive_cache.lookup(url))
+
+                shutil.rmtree(str(TestSDK.INSTALL_ROOT_PATH))
+
+    def test_install_timeout(self):
+        with HTTPServer(TestSDK.DATA_DIR, StallingRequestHandler) as server:
+            for streaming in (False, True):
+                for cache in (0, SDK.ARCHIVE_CACHE_SIZE):
+                    with self.subTest(streaming=streaming, cache=cache):
+                        StallingRequestHandler.reset()
+                        with mock.patch.object(SDK, 'URL', server.url + '/{version}.tar.gz'), \
+                                mock.patch.object(SDK, 'STREAMING', streaming), \
+                                mock.patch.object(SDK, 'ARCHIVE_CACHE_SIZE', cache), \
+                                mock.patch.object(SDK, 'DOWNLOAD_TIMEOUT', 0.2), \
+                                mock.patch.object(SDK, 'DOWNLOAD_RETRY_DELAY', 0.01):
+                            sdk = SDK(TestSDK.VERSIONS)
+                            sdk.clean()
+                            if sdk.archive_cache is not None:
+                                shutil.rmtree(str(sdk.archive_cache.path), ignore_errors=True)
+                            start = time.perf_counter()
+                            TestSDK.loop.run_until_complete(sdk.install())
+
+                        # the stalled downloads are given up, then retried.
+                        self.assertLess(time.perf_counter() - start, 1.0)
+                        self.assertEqual(list(sdk.noninstalled_packages), [])
+                        self.assertEqual(StallingRequestHandler.stalled,
+                                         {'/%s.tar.gz' % v for v in TestSDK.VERSIONS})
+
+    def test_install_altered_archive(self):
+        with HTTPServer(TestSDK.DATA_DIR, RequestHandler) as server, \
+                mock.patch.object(SDK, 'URL', server.url + '/{version}.tar.gz'):
+            TestSDK.loop.run_until_complete(SDK(TestSDK.VERSIONS).install())
+
+            # an altered archive of the same size is downloaded again, rather than extracted.
+            sdk = SDK(TestSDK.VERSIONS)
+            archive = sdk.archive_cache.lookup(sdk.packages[0].url)
+            with archive.open(mode='r+b') as f:
+                f.seek(100)
+                data = f.read(100)
+                f.seek(100)
+                f.write(bytes(b ^ 0xff for b in data))
+
+            sdk.clean()
+            TestSDK.loop.run_until_complete(sdk.install())
+
+        self.assertEqual(list(sdk.noninstalled_packages), [])
+        results = TestSDK.loop.run_until_complete(sdk.verify(hash=True))
+        self.assertEqual(results, {v: [] for v in TestSDK.VERSIONS})
+
+    def test_install_corrupt_archive(self):
+        for streaming in (False, True):
+            with self.subTest(streaming=streaming), tempfile.TemporaryDirectory() as d, \
+                    HTTPServer(d, RequestHandler) as server, \
+                    mock.patch.object(SDK, 'STREAMING', streaming):
+                for v in TestSDK.VERSIONS:
+                    Path(d, '%s.tar.gz' % v).write_bytes(b'<html>Not Found</html>')
+
+                sdk = SDK(TestSDK.VERSIONS, sources=[server.url + '/{version}.tar.gz'])
+                sdk.clean()
+                TestSDK.loop.run_until_complete(sdk.install())
+                self.assertEqual(len(list(sdk.noninstalled_packages)), len(TestSDK.VERSIONS))
+
+                # an archive that cannot be extracted is not kept by the cache.
+                self.assertEqual([sdk.archive_cache.lookup(p.url) for p in sdk.packages],
+                                 [None] * len(TestSDK.VERSIONS))
+
+                for v in TestSDK.VERSIONS:
+                    shutil.copy(str(TestSDK.DATA_DIR.joinpath('%s.tar.gz' % v)), d)
+                sdk = SDK(TestSDK.VERSIONS, sources=[server.url + '/{version}.tar.gz'])
+                TestSDK.loop.run_until_complete(sdk.install())
+                self.assertEqual(list(sdk.noninstalled_packages), [])
+
+    def test_sources(self):
+        sdk = SDK(TestSDK.VERSIONS, sources=['tests/data', 'http://mirror/{version}.tar.gz'])
+        self.assertEqual(sdk.sources, [DirectorySource(TestSDK.DATA_DIR),
+                                       URLSource('http://mirror/{version}.tar.gz')])
+        self.assertEqual(sdk.packages[0].urls, [s.url('1.2.0') for s in sdk.sources])
+
+    def test_install_source_layout(self):
+        # the archives of a source are not necessarily named after the versions.
+        for template in ('{version}/sqt.tar.gz', 'sqt-{version}.tgz'):
+            with self.subTest(template=template), tempfile.TemporaryDirectory() as d:
+                source = URLSource(Path(d).as_uri() + '/' + template)
+                for v in TestSDK.VERSIONS:
+                    filepath = Path(d, template.format(version=v))
+                    filepath.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copy(str(TestSDK.DATA_DIR.joinpath('%s.tar.gz' % v)), str(filepath))
+
+                sdk = SDK(TestSDK.VERSIONS, sources=[source])
+                sdk.clean()
+                self.assertEqual([str(p.version) for p in sdk.packages], TestSDK.VERSIONS)
+                TestSDK.loop.run_until_complete(sdk.install())
+
+                self.assertEqual(list(sdk.noninstalled_packages), [])
+                self.assertEqual([p.path.name for p in sdk.packages], TestSDK.VERSIONS)
+
+    def test_install_sources(self):
+        UnreliableRequestHandler.reset()
+
+        with tempfile.TemporaryDirectory() as d, \
+                HTTPServer(TestSDK.DATA_DIR, UnreliableRequestHandler) as server:
+            # 1.2.0 only is mirrored in the local directory, and the HTTP mirror fails once per
+            # package.
+            shutil.copy(str(TestSDK.DATA_DIR.joinpath('1.2.0.tar.gz')), d)
+            mirror = URLSource(server.url + '/{version}.tar.gz')
+
+            with mock.patch.object(SDK, 'DOWNLOAD_RETRY_DELAY', 0.01):
+                sdk = SDK(TestSDK.VERSIONS, sources=[mirror, d])
+                TestSDK.loop.run_until_complete(sdk.install())
+
+        # the local directory is the fastest source, so it is tried first.
+        self.assertEqual(list(sdk.noninstalled_packages), [])
+        self.assertEqual(sdk.packages[0].url, DirectorySource(d).url('1.2.0'))
+        self.assertEqual(sdk.packages[1].url, mirror.url('1.1.0'))
+        self.assertEqual(UnreliableRequestHandler.failures, {'/1.1.0.tar.gz'})
+
+    def test_install_twice_sources(self):
+        mirror = URLSource('http://127.0.0.1:9/{version}.tar.gz')
+        sdk = SDK(TestSDK.VERSIONS, sources=[mirror, TestSDK.DATA_DIR])
+
+        async def rank_sources(self, version):
+            return [1, 0]
+
+        # the sources are ranked again at each installation, from their priority order.
+        with mock.patch.object(SDK, '_rank_sources', rank_sources), \
+                mock.patch.object(SDK, 'DOWNLOAD_RETRY_DELAY', 0.01):
+            for _ in range(2):
+                sdk.clean()
+                TestSDK.loop.run_until_complete(sdk.install())
+
+                self.assertEqual(list(sdk.noninstalled_packages), [])
+                self.assertEqual([p.urls for p in sdk.packages],
+                                 [[DirectorySource(TestSDK.DATA_DIR).url(v), mirror.url(v)]
+                                  for v in TestSDK.VERSIONS])
+
+    def test_install_corrupt_source(self):
+        async def rank_sources(self, version):
+            return [0, 1]
+
+        with tempfile.TemporaryDirectory() as d:
+            # the mirror serves a file that is not compressed, and one that is not a tar archive.
+            Path(d, '1.2.0.tar.gz').write_bytes(b'<html>Not Found</html>')
+            Path(d, '1.1.0.tar.gz').write_bytes(gzip.compress(b'<html>Not Found</html>'))
+
+            with HTTPServer(d, RequestHandler) as server:
+                mirror = URLSource(server.url + '/{version}.tar.gz')
+
+                for streaming in (False, True):
+                    for cache in (0, SDK.ARCHIVE_CACHE_SIZE):
+                        with self.subTest(streaming=streaming, cache=cache), \
+                                mock.patch.object(SDK, 'STREAMING', streaming), \
+                                mock.patch.object(SDK, 'ARCHIVE_CACHE_SIZE', cache), \
+                                mock.patch.object(SDK, '_rank_sources', rank_sources):
+                            sdk = SDK(TestSDK.VERSIONS, sources=[mirror, TestSDK.DATA_DIR])
+                            sdk.clean()
+                            TestSDK.loop.run_until_complete(sdk.install())
+
+                            # the packages are downloaded from the next source.
+                            self.assertEqual(list(sdk.noninstalled_packages), [])
+                            self.assertEqual([p.url for p in sdk.packages],
+                                             [DirectorySource(TestSDK.DATA_DIR).url(v)
+                                              for v in TestSDK.VERSIONS])
+                            results = TestSDK.loop.run_until_complete(sdk.verify(hash=True))
+                            self.assertEqual(results, {v: [] for v in TestSDK.VERSIONS})
+                            self.assertEqual(list(sdk.qbs_root_path.glob('.*')), [])
+
+    def test_install_unavailable_source(self):
+        with tempfile.TemporaryDirectory() as d:
+            sdk = SDK(TestSDK.VERSIONS, sources=[d, TestSDK.DATA_DIR])
+            TestSDK.loop.run_until_complete(sdk.install())
+
+        self.assertEqual(list(sdk.noninstalled_packages), [])
+        self.assertEqual([p.url for p in sdk.packages],
+                         [DirectorySource(TestSDK.DATA_DIR).url(v) for v in TestSDK.VERSIONS])
+
+    def test_install_resume(self):
+        size = sum(TestSDK.DATA_DIR.joinpath('%s.tar.gz' % v).stat().st_size
+                   for v in TestSDK.VERSIONS)
+
+        for streaming in (False, True):
+            for cache in (0, SDK.ARCHIVE_CACHE_SIZE):
+                with self.subTest(streaming=streaming, cache=cache):
+                    DroppingRequestHandler.reset()
+
+                    with HTTPServer(TestSDK.DATA_DIR, DroppingRequestHandler) as server, \
+                            mock.patch.object(SDK, 'URL', server.url + '/{version}.tar.gz'), \
+                            mock.patch.object(SDK, 'STREAMING', streaming), \
+                            mock.patch.object(SDK, 'ARCHIVE_CACHE_SIZE', cache), \
+                            mock.patch.object(SDK, 'DOWNLOAD_RETRY_DELAY', 0.01):
+                        sdk = SDK(TestSDK.VERSIONS)
+                        TestSDK.loop.run_until_complete(sdk.install())
+
+                    self.assertEqual(list(sdk.noninstalled_packages), [])
+                    if streaming and not cache:
+                        # nothing is kept on the disk, so the download starts over.
+                        self.assertEqual(DroppingRequestHandler.sent, size + size // 2)
+                    else:
+                        # each package is downloaded once, its second half being requested again.
+                        self.assertLessEqual(DroppingRequestHandler.sent, size)
+                        self.assertEqual(sorted(r[1] is not None
+                                                for r in DroppingRequestHandler.ranges),
+                                         [False, False, True, True])
+
+                    shutil.rmtree(str(TestSDK.INSTALL_ROOT_PATH))
+
+    def test_install_resume_next_run(self):
+        for streaming in (False, True):
+            with self.subTest(streaming=streaming):
+                DroppingRequestHandler.reset()
+
+                with HTTPServer(TestSDK.DATA_DIR, DroppingRequestHandler) as server, \
+                        mock.patch.object(SDK, 'URL', server.url + '/{version}.tar.gz'), \
+                        mock.patch.object(SDK, 'STREAMING', streaming), \
+                        mock.patch.object(SDK, 'DOWNLOAD_RETRIES', 0):
+                    sdk = SDK(TestSDK.VERSIONS)
+                    TestSDK.loop.run_until_complete(sdk.install())
+                    self.assertEqual(len(list(sdk.noninstalled_packages)), 2)
+                    self.assertEqual(len(list(sdk.archive_cache.path.glob('partial/*.part'))), 2)
+
+                    sdk = SDK(TestSDK.VERSIONS)
+                    TestSDK.loop.run_until_complete(sdk.install())
+
+                self.assertEqual(list(sdk.noninstalled_packages), [])
+                self.assertEqual([r[1] is not None for r in DroppingRequestHandler.ranges],
+                                 [False, False, True, True])
+                self.assertEqual(list(sdk.archive_cache.path.glob('partial/*')), [])
+
+                shutil.rmtree(str(TestSDK.INSTALL_ROOT_PATH))
+
+    def test_verify(self):
+        for streaming in (False, True):
+            with self.subTest(streaming=streaming):
+                with mock.patch.object(SDK, 'STREAMING', streaming):
+                    sdk = SDK(TestSDK.VERSIONS)
+                    TestSDK.loop.run_until_complete(sdk.install())
+
+                results = TestSDK.loop.run_until_complete(sdk.verify(hash=True))
+                self.assertEqual(results, {v: [] for v in TestSDK.VERSIONS})
+
+                package = sdk.packages[0]
+                name = sorted(Manifest.read(package.manifest_path).entries)[0]
+                package.path.joinpath(name).write_bytes(b'')
+                results = TestSDK.loop.run_until_complete(sdk.verify())
+                self.assertEqual(results, {'1.2.0': [(name, Manifest.SIZE)], '1.1.0': []})
+
+                sdk.clean()
+
+    def test_delta_update(self):
+        # the digests of a package installed from scratch.
+        TestSDK.loop.run_until_complete(SDK(['1.2.0']).install())
+        entries = Manifest.read(self.sdk.packages[0].manifest_path).entries
+        expected = {n: e[2] for n, e in entries.items()}
+        self.sdk.clean()
+
+        with mock.patch.object(SDK, 'DELTA_UPDATES', True):
+            TestSDK.loop.run_until_complete(SDK(['1.1.0']).install())
+            base = self.sdk.packages[1]
+            modified = sorted(Manifest.read(base.manifest_path).entries)[0]
+            os.utime(str(base.path.joinpath(modified)), ns=(0, 0))
+
+            sdk = SDK(['1.2.0'])
+            TestSDK.loop.run_until_complete(sdk.install())
+
+        package = sdk.packages[0]
+        self.assertEqual(package.base, base.path)
+        manifest = Manifest.read(package.manifest_path)
+        self.assertEqual(manifest, Manifest.build(package.path))
+        self.assertEqual({n: e[2] for n, e in manifest.entries.items()}, expected)
+        self.assertEqual(TestSDK.loop.run_until_complete(sdk.verify(hash=True)), {'1.2.0': []})
+
+        # the unchanged files are shared with the base version, except the modified one.
+        base_manifest = Manifest.read(base.manifest_path)
+        for name, entry in manifest.entries.items():
+            if name in base_manifest.entries and base_manifest.entries[name][2] == entry[2]:
+                with self.subTest(name):
+                    samefile = os.path.samefile(str(package.path.joinpath(name)),
+                                                str(base.path.joinpath(name)))
+                    self.assertEqual(samefile, name != modified)
+
+    def test_install_locked(self):
+        lock = FileLock(self.sdk.lock.path)
+        lock.acquire()
+
+        # the install waits for the other process to release the lock.
+        with mock.patch.object(SDK, 'LOCK_POLL_INTERVAL', 0.01):
+            task = asyncio.ensure_future(self.sdk.install(), loop=TestSDK.loop)
+            TestSDK.loop.run_until_complete(asyncio.sleep(0.1))
+            self.assertFalse(task.done())
+            self.assertEqual(len(list(self.sdk.noninstalled_packages)), len(TestSDK.VERSIONS))
+
+            lock.release()
+            TestSDK.loop.run_until_complete(task)
+
+        self.assertEqual(list(self.sdk.noninstalled_packages), [])
+        self.assertFalse(self.sdk.lock.locked)
+
+    def test_clean_locked(self):
+        TestSDK.loop.run_until_complete(self.sdk.install())
+        lock = FileLock(self.sdk.lock.path)
+        lock.acquire()
+
+        # the packages of the other process are not removed until it releases the lock.
+        thread = threading.Thread(target=self.sdk.clean)
+        thread.start()
+        thread.join(0.1)
+        self.assertTrue(thread.is_alive())
+        self.assertEqual(list(self.sdk.noninstalled_packages), [])
+
+        lock.release()
+        thread.join(5)
+        self.assertEqual(len(list(self.sdk.noninstalled_packages)), len(TestSDK.VERSIONS))
+        self.assertFalse(self.sdk.lock.locked)
+
+    def test_install_crash(self):
+        # a crash while a package is copied leaves nothing in its install location.
+        package = self.sdk.packages[0]
+        copy_file = _CopyEngine._copy_file
+        copying = threading.Event()
+        copies = []
+
+        def crash(src, dst):
+            if package.staging_path in dst.parents:
+                # the other package is being copied when the crash happens.
+                copying.wait(5)
+                raise RuntimeError('crash')
+            copying.set()
+            try:
+                time.sleep(0.005)
+                return copy_file(src, dst)
+            finally:
+                copies.append(time.perf_counter())
+
+        with mock.patch.object(SDK, 'STREAMING', False):
+            sdk = SDK(TestSDK.VERSIONS)
+            with mock.patch.object(_CopyEngine, '_copy_file', side_effect=crash):
+                with self.assertRaises(RuntimeError):
+                    TestSDK.loop.run_until_complete(sdk.install())
+                returned = time.perf_counter()
+                time.sleep(0.05)
+
+        # no thread copies a file once the install returned.
+        self.assertTrue(copies)
+        self.assertTrue(all(t < returned for t in copies))
+        self.assertFalse(package.path.exists())
+        self.assertTrue(package.staging_path.exists())
+        self.assertFalse(sdk.lock.locked)
+
+        # the staging directory of the crashed install is removed by the next one.
+        stale = self.sdk.qbs_root_path.joinpath('.0.9.0.staging')
+        stale.mkdir()
+        TestSDK.loop.run_until_complete(self.sdk.install())
+
+        self.assertEqual(list(self.sdk.noninstalled_packages), [])
+        self.assertEqual(list(self.sdk.qbs_root_path.glob('.*.staging')), [])
+
+    def test_install_incomplete(self):
+        TestSDK.loop.run_until_complete(self.sdk.install())
+
+        # a package without manifest was not installed completely, so it is installed again.
+        package = self.sdk.packages[0]
+        package.manifest_path.unlink()
+        package.path.joinpath('stale').touch()
+        self.assertEqual(list(self.sdk.noninstalled_packages), [package])
+        results = TestSDK.loop.run_until_complete(self.sdk.verify())
+        self.assertEqual(results['1.2.0'], [(Manifest.FILENAME, Manifest.MISSING)])
+
+        TestSDK.loop.run_until_complete(self.sdk.install())
+        self.assertEqual(list(self.sdk.noninstalled_packages), [])
+        self.assertFalse(package.path.joinpath('stale').exists())
+
+    def test_deduplicate(self):
+        for streaming in (False, True):
+            with self.subTest(streaming=streaming):
+                with mock.patch.multiple(SDK, STREAMING=streaming, DEDUPLICATE=True):
+                    sdk = SDK(TestSDK.VERSIONS)
+                    TestSDK.loop.run_until_complete(sdk.install())
+
+                # the files shared by the versions are stored once.
+                first, second = (Manifest.read(p.manifest_path) for p in sdk.packages)
+                digests = {e[2] for e in first.entries.values()}
+                digests.update(e[2] for e in second.entries.values())
+                objects = [f for f in sdk.object_store.path.glob('*/*') if f.is_file()]
+                self.assertEqual(len(objects), len(digests))
+
+                for name in set(first.entries) & set(second.entries):
+                    if first.entries[name][2] == second.entries[name][2]:
+                        with self.subTest(name):
+                            a, b = (p.path.joinpath(name) for p in sdk.packages)
+                            self.assertEqual(a.read_bytes(), b.read_bytes())
+
+                results = TestSDK.loop.run_until_complete(sdk.verify(hash=True))
+                self.assertEqual(results, {v: [] for v in TestSDK.VERSIONS})
+
+                sdk.clean()
+                self.assertFalse(sdk.object_store.path.exists())
+
+
+@asyncio_loop
+class TestDownloadScheduler(unittest.TestCase):
+    class Package:
+        def __init__(self, url, events):
+            self.url = url
+            self.urls = [url]
+            self._events = events
+
+        async def download(self, dir, progress=None):
+            self._events.append(('start', self.url))
+            await asyncio.sleep(0.05)
+            self._events.append(('end', self.url))
+            return self
+
+    def test_host_limit(self):
+        events = []
+        urls = ['http://a/1.tar.gz', 'http://a/2.tar.gz', 'http://b/1.tar.gz']
+        packages = [self.Package(url, events) for url in urls]
+        scheduler = _DownloadScheduler(2, 1, 0, 0.0)
+
+        self.loop.run_until_complete(asyncio.gather(*(scheduler.download(p, None)
+                                                      for p in packages)))
+
+        # the download queued behind the busy host does not hold back the other host.
+        self.assertLess(events.index(('start', urls[2])), events.index(('end', urls[0])))
+        self.assertLess(events.index(('end', urls[0])), events.index(('start', urls[1])))
+
+
+class TestPackage(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filepath = Path(self.tempdir.name, 'module.qbs')
+        self.filepath.write_bytes(b'Module {}')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_fsync(self):
+        with mock.patch('os.open', wraps=os.open) as open_:
+            _Package._fsync(self.filepath)
+            _Package._fsync(Path(self.tempdir.name))
+
+        self.assertEqual([c[0][1] for c in open_.call_args_list], [os.O_RDONLY, os.O_RDONLY])
+
+    def test_fsync_win32(self):
+        # os.fsync needs a write access under Windows, and the directories cannot be opened.
+        with mock.patch('sys.platform', 'win32'), mock.patch('os.open', wraps=os.open) as open_:
+            _Package._fsync(self.filepath)
+            _Package._fsync(Path(self.tempdir.name))
+            with mock.patch('os.access', return_value=False):
+                _Package._fsync(self.filepath)
+
+        self.assertEqual([c[0][1] for c in open_.call_args_list], [os.O_RDWR])
+
+
+class TestCopyEngine(unittest.TestCase):
+    FILES = {'imports/Stoiridh/Utils/Utils.qbs': b'Module {}',
+             'modules/Python/python.qbs': b'Module { property string version }' * 1024,
+             'python/stoiridh.py': b'import sys\n',
+             'empty': b''}
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.src = Path(self.tempdir.name, 'src')
+        self.dst = Path(self.tempdir.name, 'dst')
+
+        for name, content in self.FILES.items():
+            filepath = self.src.joinpath(name)
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            filepath.write_bytes(content)
+            os.utime(str(filepath), ns=(0, 1000000000))
+        self.src.joinpath('modules', 'Empty').mkdir()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def check(self, files, size):
+        self.assertEqual(files, len(self.FILES))
+        self.assertEqual(size, sum(len(c) for c in self.FILES.values()))
+        self.assertTrue(self.dst.joinpath('modules', 'Empty').is_dir())
+
+        for name, content in self.FILES.items():
+            with self.subTest(name):
+                filepath = self.dst.joinpath(name)
+                self.assertEqual(filepath.read_bytes(), content)
+                self.assertEqual(os.stat(str(filepath)).st_mtime_ns, 1000000000)
+
+    def test_copy(self):
+        self.check(*_CopyEngine(workers=2).copy(self.src, self.dst))
+        self.assertRaises(FileExistsError, _CopyEngine().copy, self.src, self.dst)
+
+    def test_copy_fallback(self):
+        # the files are copied in user space when the kernel cannot copy them.
+        error = OSError(errno.ENOSYS, 'copy_file_range')
+        with mock.patch.object(_CopyEngine, '_copy_file_range', True), \
+                mock.patch('os.copy_file_range', side_effect=error, create=True):
+            self.check(*_CopyEngine().copy(self.src, self.dst))
+            self.assertFalse(_CopyEngine._copy_file_range)
+
+    def test_copy_nothing_copied(self):
+        # the files are copied in user space when the kernel copies nothing.
+        with mock.patch.object(_CopyEngine, '_copy_file_range', True), \
+                mock.patch('os.copy_file_range', return_value=0, create=True):
+            self.check(*_CopyEngine().copy(self.src, self.dst))
+
+    def test_copy_short(self):
+        # a file partially copied by the kernel is not taken as a copy of the whole file.
+        with mock.patch.object(_CopyEngine, '_copy_file_range', True), \
+                mock.patch('os.copy_file_range', side_effect=[1, 0], create=True):
+            self.dst.mkdir()
+            with self.assertRaises(OSError) as cm:
+                _CopyEngine._copy_file(self.src.joinpath('python', 'stoiridh.py'),
+                                       self.dst.joinpath('stoiridh.py'))
+            self.assertEqual(cm.exception.errno, errno.EIO)
+
+
+class TestExtractor(unittest.TestCase):
+    MEMBERS = ['root/README.md',
+               'root/share/qbs/modules/a.qbs',
+               'root/share/qbs/imports/b.js',
+               'root/share/../../outside.txt',
+               'root/share//absolute.txt',
+               'root/share/qbs/../../../escape.txt',
+               'other/share/qbs/c.qbs']
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tempdir.name, 'dest')
+        self.path.mkdir()
+
+        self.archive = io.BytesIO()
+        with tarfile.open(fileobj=self.archive, mode='w:gz') as tar:
+            info = tarfile.TarInfo('root')
+            info.type = tarfile.DIRTYPE
+            tar.addfile(info)
+            for name in self.MEMBERS:
+                info = tarfile.TarInfo(name)
+                info.size = len(name)
+                tar.addfile(info, io.BytesIO(name.encode()))
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def extracted(self):
+        return sorted(str(p.relative_to(self.path)) for p in self.path.glob('**/*') if p.is_file())
+
+    def test_extract(self):
+        for mode in ('r:gz', 'r|gz'):
+            with self.subTest(mode):
+                shutil.rmtree(str(self.path))
+                self.archive.seek(0)
+                with tarfile.open(fileobj=self.archive, mode=mode) as tar:
+                    count = _Extractor(tar, self.path).extract()
+
+                # only the files of root/share are extracted, within the destination directory.
+                self.assertEqual(count, 2)
+                self.assertEqual(self.extracted(), ['qbs/imports/b.js', 'qbs/modules/a.qbs'])
+                self.assertEqual(self.path.joinpath('qbs/modules/a.qbs').read_text(),
+                                 'root/share/qbs/modules/a.qbs')
+                self.assertEqual(list(Path(self.tempdir.name).iterdir()), [self.path])
+
+    def test_safe_name(self):
+        self.assertEqual(_Extractor.safe_name('qbs/./modules/a.qbs'), 'qbs/modules/a.qbs')
+        self.assertEqual(_Extractor.safe_name('qbs\\modules\\a.qbs'), 'qbs/modules/a.qbs')
+        self.assertEqual(_Extractor.safe_name('qbs/../a.qbs'), 'a.qbs')
+
+        for name in ('/etc/passwd', '../a.qbs', 'qbs/../../a.qbs', '..', '', 'C:/a.qbs',
+                     'C:\\a.qbs'):
+            with self.subTest(name):
+                self.assertIsNone(_Extractor.safe_name(name))
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+import tempfile
+import unittest
+
+from pathlib import Path
+from stoiridh.qbs.tools import DirectorySource, URLSource
+from util.httpserver import HTTPServer
+
+
+class TestSources(unittest.TestCase):
+    DATA_DIR = Path('tests/data').resolve()
+
+    def test_url_source(self):
+        source = URLSource('https://mirror.example.org/{version}.tar.gz')
+        self.assertEqual(source.url('1.1.0'), 'https://mirror.example.org/1.1.0.tar.gz')
+        self.assertEqual(source, URLSource('https://mirror.example.org/{version}.tar.gz'))
+
+        with self.assertRaises(ValueError):
+            URLSource('https://mirror.example.org/1.1.0.tar.gz')
+
+    def test_directory_source(self):
+        source = DirectorySource('tests/data')
+        self.assertEqual(source.path, TestSources.DATA_DIR)
+        self.assertEqual(source.url('1.1.0'),
+                         TestSources.DATA_DIR.joinpath('1.1.0.tar.gz').as_uri())
+        self.assertEqual(source, URLSource(TestSources.DATA_DIR.as_uri() + '/{version}.tar.gz'))
+
+        with self.assertRaises(TypeError):
+            DirectorySource(None)
+
+    def test_probe(self):
+        with tempfile.TemporaryDirectory() as d:
+            for source in (DirectorySource(TestSources.DATA_DIR), DirectorySource(d)):
+                with self.subTest(source):
+                    self.assertIsNone(source.probe('9.9.9'))
+                    if source.path == TestSources.DATA_DIR:
+                        self.assertGreaterEqual(source.probe('1.1.0'), 0)
+                    else:
+                        self.assertIsNone(source.probe('1.1.0'))
+
+        with HTTPServer(TestSources.DATA_DIR) as server:
+            source = URLSource(server.url + '/{version}.tar.gz')
+            self.assertGreaterEqual(source.probe('1.1.0'), 0)
+            self.assertIsNone(source.probe('9.9.9'))
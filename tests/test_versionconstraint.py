@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+import unittest
+
+from stoiridh.qbs.tools import VersionConstraint, VersionNumber
+
+
+class TestVersionConstraint(unittest.TestCase):
+    def setUp(self):
+        self.constraint = VersionConstraint('>=1.5,<2.0,!=1.6.1')
+        self.versions = [VersionNumber(v) for v in ['1.4.5', '1.5.0', '1.6.1', '1.9.9', '2.0.0',
+                                                    '1.6.0']]
+
+    def test_init(self):
+        self.assertEqual(self.constraint.expression, '>=1.5, <2.0, !=1.6.1')
+
+        with self.assertRaises(TypeError):
+            VersionConstraint(VersionNumber('1.5.0'))
+
+        for expression in ['', '>=', '=>1.5', '>=1.5,,<2.0', '~1.5', '>=1.5.0.1']:
+            with self.subTest(expression):
+                with self.assertRaises(ValueError):
+                    VersionConstraint(expression)
+
+    def test_parse(self):
+        self.assertIs(VersionConstraint.parse(self.constraint), self.constraint)
+        self.assertEqual(VersionConstraint.parse(VersionNumber('1.5.0')).expression, '>=1.5.0')
+        self.assertEqual(VersionConstraint.parse('<2.0').expression, '<2.0')
+
+        with self.assertRaises(TypeError):
+            VersionConstraint.parse(1.5)
+
+    def test_minimum(self):
+        self.assertEqual(self.constraint.minimum, VersionNumber('1.5.0'))
+        self.assertEqual(VersionConstraint('>1.5.0').minimum, VersionNumber('1.5.1'))
+        self.assertEqual(VersionConstraint('>=1.4, ==1.6.2').minimum, VersionNumber('1.6.2'))
+        self.assertIsNone(VersionConstraint('<2.0').minimum)
+
+    def test_matches(self):
+        data = [
+            ('>=1.5', '1.5.0', True), ('>=1.5', '1.4.9', False),
+            ('>1.5', '1.5.0', False), ('>1.5', '1.5.1', True),
+            ('<=1.5', '1.5.0', True), ('<=1.5', '1.5.1', False),
+            ('<1.5', '1.5.0', False), ('<1.5', '1.4.99', True),
+            ('==1.5', '1.5.0', True), ('1.5', '1.5.1', False),
+            ('!=1.5', '1.5.0', False), ('!=1.5', '1.5.1', True),
+            ('>=2.0, <1.0', '1.5.0', False)
+        ]
+
+        for expression, version, expected in data:
+            with self.subTest('%s %s' % (expression, version)):
+                c = VersionConstraint(expression)
+                self.assertEqual(c.matches(VersionNumber(version)), expected)
+                self.assertEqual(VersionNumber(version) in c, expected)
+
+        with self.assertRaises(TypeError):
+            self.constraint.matches('1.5.0')
+        self.assertNotIn('1.5.0', self.constraint)
+
+    def test_filter(self):
+        self.assertEqual([str(v) for v in self.constraint.filter(self.versions)],
+                         ['1.5.0', '1.9.9', '1.6.0'])
+        self.assertEqual(self.constraint.filter([]), [])
+
+    def test_best_match(self):
+        self.assertEqual(self.constraint.best_match(self.versions), VersionNumber('1.9.9'))
+        self.assertIsNone(VersionConstraint('>=3.0').best_match(self.versions))
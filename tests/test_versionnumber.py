@@ -72,18 +72,71 @@ class TestVersionNumber(unittest.TestCase):
 
     def test_major(self):
         self.assertEqual(self.v.major, 2)
-        self.v.major = 1
-        self.assertEqual(self.v.major, 1)
+        with self.assertRaises(AttributeError):
+            self.v.major = 1
 
     def test_minor(self):
         self.assertEqual(self.v.minor, 4)
-        self.v.minor = 5
-        self.assertEqual(self.v.minor, 5)
+        with self.assertRaises(AttributeError):
+            self.v.minor = 5
 
     def test_patch(self):
         self.assertEqual(self.v.patch, 2)
-        self.v.patch = 73
-        self.assertEqual(self.v.patch, 73)
+        with self.assertRaises(AttributeError):
+            self.v.patch = 73
+
+    def test_immutable(self):
+        with self.assertRaises(AttributeError):
+            self.v.build = 42
+        self.assertIs(VersionNumber(self.v), self.v)
+
+    def test_parse_all(self):
+        versions, errors = VersionNumber.parse_all(['1.6.0', 'v1.5', '1.10', '1.5.0', 1.5,
+                                                    '1.6.0', '1.2.3-prerelease'])
+        self.assertEqual([str(v) for v in versions], ['1.5.0', '1.6.0', '1.6.0', '1.10.0'])
+        self.assertIs(versions[1], versions[2])
+
+        self.assertEqual([(index, item) for index, item, _ in errors],
+                         [(1, 'v1.5'), (4, 1.5), (6, '1.2.3-prerelease')])
+        self.assertIsInstance(errors[0][2], ValueError)
+        self.assertIsInstance(errors[1][2], TypeError)
+
+        versions, errors = VersionNumber.parse_all(iter(['2.0', '1.0']), sort=False)
+        self.assertEqual(versions, [VersionNumber(2, 0, 0), VersionNumber(1, 0, 0)])
+        self.assertEqual(errors, [])
+
+        # the version numbers are the ones of the constructor.
+        versions, _ = VersionNumber.parse_all(['1.5.0', '1.5'])
+        self.assertIs(versions[0], VersionNumber('1.5.0'))
+        self.assertIs(versions[1], VersionNumber('1.5'))
+
+        # the segments do not fit into the packed key
+        versions, _ = VersionNumber.parse_all(['%d.0' % (1 << 22), '%d.0' % (1 << 21), '1.0'])
+        self.assertEqual([v.major for v in versions], [1, 1 << 21, 1 << 22])
+
+    def test_cache(self):
+        VersionNumber.cache_clear()
+
+        v = VersionNumber('7.3.1')
+        self.assertIs(VersionNumber('7.3.1'), v)
+        self.assertIsNot(VersionNumber('7.3'), v)
+
+        info = VersionNumber.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 2, 2))
+        self.assertEqual(info.maxsize, VersionNumber.CACHE_SIZE)
+
+        with self.assertRaises(ValueError):
+            VersionNumber('7.3.1.0')
+        self.assertEqual(VersionNumber.cache_info().currsize, 2)
+
+        VersionNumber.cache_clear()
+        self.assertEqual(VersionNumber.cache_info().currsize, 0)
+        self.assertEqual(VersionNumber('7.3.1'), v)
+
+    def test_hash(self):
+        self.assertEqual(hash(self.v), hash(VersionNumber(2, 4, 2)))
+        self.assertEqual(len({self.v, VersionNumber('2.4.2'), VersionNumber('2.4')}), 2)
+        self.assertEqual({self.v: 'data'}[VersionNumber(2, 4, 2)], 'data')
 
     def test_bf_str(self):
         self.assertEqual(str(self.v), '2.4.2')
@@ -101,6 +154,8 @@ class TestVersionNumber(unittest.TestCase):
         self.assertLess(self.v, VersionNumber('2.4.3'))
         self.assertLess(self.v, VersionNumber('2.5.0'))
         self.assertLess(self.v, VersionNumber('3.0.0'))
+        self.assertLess(self.v, VersionNumber('3.4.1'))
+        self.assertFalse(VersionNumber('3.4.1') < self.v)
 
     def test_op_le(self):
         self.assertLessEqual(self.v, VersionNumber('2.4.2'))
@@ -112,6 +167,13 @@ class TestVersionNumber(unittest.TestCase):
         self.assertGreater(self.v, VersionNumber('2.4.1'))
         self.assertGreater(self.v, VersionNumber('1.5.0'))
         self.assertGreater(self.v, VersionNumber('1.0.0'))
+        self.assertGreater(self.v, VersionNumber('1.4.7'))
+        self.assertFalse(VersionNumber('1.4.7') > self.v)
+
+    def test_sort(self):
+        versions = [VersionNumber(v) for v in ['1.10.0', '1.2.3', '2.0', '1.2', '0.9.12']]
+        self.assertEqual([str(v) for v in sorted(versions)],
+                         ['0.9.12', '1.2.0', '1.2.3', '1.10.0', '2.0.0'])
 
     def test_op_ge(self):
         self.assertGreaterEqual(self.v, VersionNumber('2.4.2'))
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+import shutil
+import stat
+
+from pathlib import Path
+
+
+# the PATH environment variable may be faked by the tests, so the sleep command is resolved once.
+SLEEP = shutil.which('sleep')
+
+
+def make_fake_qbs(directory, version, delay=0):
+    """Write a fake Qbs executable into *directory*. The executable displays *version* after having
+    slept *delay* seconds.
+
+    .. note::
+        The fake Qbs executable is a shell script, hence it is not available under Windows.
+    """
+    filepath = Path(directory, 'qbs')
+    with filepath.open(mode='w') as f:
+        f.write('#!/bin/sh\n')
+        if delay:
+            # the standard output is redirected, so that it is closed as soon as the fake Qbs
+            # executable is killed.
+            f.write('%s %s >/dev/null\n' % (SLEEP, delay))
+        f.write('echo %s\n' % version)
+    filepath.chmod(filepath.stat().st_mode | stat.S_IXUSR)
+    return filepath
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+##                                                                                                ##
+##            Copyright (C) 2016 William McKIE                                                    ##
+##                                                                                                ##
+##            This program is free software: you can redistribute it and/or modify                ##
+##            it under the terms of the GNU General Public License as published by                ##
+##            the Free Software Foundation, either version 3 of the License, or                   ##
+##            (at your option) any later version.                                                 ##
+##                                                                                                ##
+##            This program is distributed in the hope that it will be useful,                     ##
+##            but WITHOUT ANY WARRANTY; without even the implied warranty of                      ##
+##            MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the                       ##
+##            GNU General Public License for more details.                                        ##
+##                                                                                                ##
+##            You should have received a copy of the GNU General Public License                   ##
+##            along with this program.  If not, see <http://www.gnu.org/licenses/>.               ##
+##                                                                                                ##
+####################################################################################################
+import http.server
+import os
+import posixpath
+import re
+import socketserver
+import threading
+import urllib.parse
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """HTTP server that handles each request in its own thread, as
+    :py:class:`http.server.ThreadingHTTPServer`, which is only available from Python 3.7."""
+    daemon_threads = True
+
+
+class RequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Serve the files located at the root of the directory of the server, along with an ETag, and
+    honour the ``Range: bytes=<start>-`` requests."""
+    re_range = re.compile(r'^bytes=(\d+)-$')
+
+    def translate_path(self, path):
+        path = urllib.parse.urlsplit(path).path
+        return os.path.join(self.server.root, posixpath.basename(urllib.parse.unquote(path)))
+
+    def send_head(self):
+        try:
+            f = open(self.translate_path(self.path), 'rb')
+        except OSError:
+            self.send_error(404)
+            return None
+
+        st = os.fstat(f.fileno())
+        etag = '"%x-%x"' % (st.st_mtime_ns, st.st_size)
+        match = self.re_range.match(self.headers.get('Range', ''))
+        start = 0
+
+        if match and self.headers.get('If-Range', etag) == etag:
+            start = int(match.group(1))
+            if start >= st.st_size:
+                f.close()
+                self.send_error(416)
+                return None
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, st.st_size - 1,
+                                                                  st.st_size))
+        else:
+            self.send_response(200)
+
+        self.send_header('Content-Type', 'application/gzip')
+        self.send_header('Content-Length', str(st.st_size - start))
+        self.send_header('ETag', etag)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        f.seek(start)
+        return f
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HTTPServer:
+    """Context manager that serves the files of *root* over HTTP, from a background thread. Each
+    request is handled in its own thread, so that concurrent downloads can be served.
+
+    .. Examples::
+        with HTTPServer('tests/data') as server:
+            urllib.request.urlopen(server.url + '/1.1.0.tar.gz')
+    """
+    def __init__(self, root, handler=RequestHandler):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self._server.root = str(root)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d' % self._server.server_address[1]
+
+    @property
+    def server(self):
+        return self._server
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        return False